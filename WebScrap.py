@@ -1,67 +1,110 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
+from bs4 import BeautifulSoup, Comment
 import time
 import csv
-import re
 import random
-from urllib.parse import urljoin, urlparse
-import json
+from urllib.parse import urlparse
+from browser_pool import USER_AGENT, create_driver
+from page_cache import content_hash
+from record_sink import RecordSink
+from crawl_metrics import NULL_METRICS
+from insights import InsightAggregator
+from xhr_capture import captured_json, contact_objects, drain_network_log, flatten, parse_json
+import extraction
+from extraction import DEFAULT_EXTRACTOR
+
+# Selenium and requests are imported where they are used, so parsing saved
+# HTML or re-extracting archived pages never loads them
+
+CONTACT_SELECTOR = '.contact-info, .contact-details, .contact-us, #contact'
+ADDRESS_XPATH = "//*[contains(text(), 'Add') or contains(text(), 'Address')]"
+PHONE_XPATH = "//a[contains(@href, 'tel:')]"
+EMAIL_XPATH = "//a[contains(@href, 'mailto:')]"
+SERVICES_XPATH = '//*[contains(text(), "Services") or contains(text(), "Products")]'
+
+# Collects every payload piece in one WebDriver round-trip instead of one
+# round-trip per element; arguments are the selector and XPaths above
+BATCH_EXTRACTION_SCRIPT = '''
+    const [contactSelector, addressXPath, phoneXPath, emailXPath, servicesXPath] = arguments;
+    const select = (expr) => {
+        const result = document.evaluate(expr, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const nodes = [];
+        for (let i = 0; i < result.snapshotLength; i++) {
+            nodes.push(result.snapshotItem(i));
+        }
+        return nodes;
+    };
+    const parents = (expr) => select(expr)
+        .map((el) => el.parentNode)
+        .filter((parent) => parent && parent.nodeType === Node.ELEMENT_NODE);
+    return {
+        sections: Array.from(document.querySelectorAll(contactSelector))
+            .map((el) => (el.innerText || '').trim()),
+        addresses: parents(addressXPath).map((parent) => parent.innerHTML),
+        phones: select(phoneXPath).map((a) => a.href),
+        emails: select(emailXPath).map((a) => a.href),
+        services: parents(servicesXPath).map((parent) =>
+            Array.from(parent.getElementsByTagName('li')).map((li) => li.innerHTML))
+    };
+'''
+
+# Tags whose text never shows up on the rendered page
+NON_VISIBLE_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'title', 'meta'}
+
+# Markup left behind by client-side frameworks that render the page in JS
+JS_APP_MARKERS = (
+    'id="root"', "id='root'", 'id="app"', "id='app'", 'id="__next"',
+    'ng-app', 'ng-version', 'data-reactroot', 'window.__nuxt__',
+    'please enable javascript', 'you need to enable javascript'
+)
 
 class LogisticsContractorScraper:
-    def __init__(self, url):
+    def __init__(self, url, use_static=True, static_timeout=15, pool=None, batch_extract=True,
+                 page_budget=15, extractor=None, cache=None,
+                 sink=None, http=None, parser=None, metrics=None,
+                 capture_xhr=False, archive=None, response=None, use_browser=True):
         """Initialize the web scraper"""
         self.url = url
         self.base_url = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
-        self.setup_driver()
+        # Try requests + BeautifulSoup first; Selenium only when that finds nothing
+        self.use_static = use_static
+        self.use_browser = use_browser
+        self.static_timeout = static_timeout
+        self.headers = {'User-Agent': USER_AGENT}
+        self.http = http
+        self.parser = parser
+        self.metrics = metrics or NULL_METRICS
+        self.capture_xhr = capture_xhr
+        self.api_records = []
+        self.learned_endpoints = []
+        self.pool = pool
+        self.batch_extract = batch_extract
+        # Seconds for loading and waiting on the whole page in the browser
+        self.page_budget = page_budget
+        self.wait_time = 0.0
+        self.extractor = extractor or DEFAULT_EXTRACTOR
+        self.cache = cache
+        self.sink = sink
+        self.archive = archive
+        # Response for url already fetched by SiteCrawler, scraped instead of refetching
+        self.response = response
+        self.validators = None
+        self.from_cache = False
+        self.driver = None
         self.contractors = []
+        self.error = None
 
     def setup_driver(self):
-        """Configure Selenium WebDriver"""
-        chrome_options = Options()
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-infobars')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Add custom headers
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        
-        from webdriver_manager.chrome import ChromeDriverManager
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
-        )
-        
-        # Set window size
-        self.driver.set_window_size(1920, 1080)
-        
-        # Mask automation
-        self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5]
-                });
-                window.chrome = {
-                    runtime: {}
-                };
-            '''
-        })
+        """Configure Selenium WebDriver, borrowing one from the pool if given"""
+        with self.metrics.span('driver_setup', self.url):
+            if self.pool is not None:
+                self.driver = self.pool.acquire()
+            else:
+                self.driver = create_driver(USER_AGENT, capture_network=self.capture_xhr)
 
     def wait_and_find_element(self, by, value, timeout=10):
         """Wait for and find an element"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         try:
             element = WebDriverWait(self.driver, timeout).until(
                 EC.presence_of_element_located((by, value))
@@ -72,6 +115,8 @@ class LogisticsContractorScraper:
 
     def wait_and_find_elements(self, by, value, timeout=10):
         """Wait for and find multiple elements"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
         try:
             elements = WebDriverWait(self.driver, timeout).until(
                 EC.presence_of_all_elements_located((by, value))
@@ -80,6 +125,43 @@ class LogisticsContractorScraper:
         except Exception:
             return []
 
+    def find_elements_now(self, by, value):
+        """Find elements without waiting for them to appear"""
+        try:
+            return self.driver.find_elements(by, value)
+        except Exception:
+            return []
+
+    def wait_for_page_ready(self, timeout, poll=0.25, stable_polls=2):
+        """Wait until the document has loaded and its DOM stops growing
+
+        Returns the seconds spent waiting, which is also added to wait_time.
+        """
+        start = time.monotonic()
+        last_size = None
+        stable = 0
+        while True:
+            try:
+                state, size = self.driver.execute_script(
+                    "return [document.readyState, document.getElementsByTagName('*').length];"
+                )
+            except Exception:
+                state, size = None, None
+
+            if state == 'complete' and size:
+                stable = stable + 1 if size == last_size else 0
+                if stable >= stable_polls:
+                    break
+            last_size = size
+
+            if time.monotonic() - start + poll > timeout:
+                break
+            time.sleep(poll)
+
+        waited = time.monotonic() - start
+        self.wait_time += waited
+        return waited
+
     def safe_click(self, element):
         """Safely click an element using JavaScript"""
         try:
@@ -101,217 +183,476 @@ class LogisticsContractorScraper:
 
     def clean_html(self, text):
         """Clean HTML tags from text"""
-        # Remove HTML tags
-        clean = re.sub(r'<[^>]+>', ' ', text)
-        # Fix spaces
-        clean = re.sub(r'\s+', ' ', clean)
-        # Clean up special characters
-        clean = clean.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&quot;', '"')
-        return clean.strip()
+        return extraction.clean_html(text)
+
+    def close(self):
+        """Quit the browser, or hand it back to the pool"""
+        if self.driver is None:
+            return
+        if self.pool is not None:
+            self.pool.release(self.driver)
+        else:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+        self.driver = None
+
+    def empty_payload(self):
+        """Raw page pieces that build_contact_info turns into a record"""
+        return {
+            'sections': [],     # text of the contact sections
+            'addresses': [],    # innerHTML of parents of 'Add'/'Address' text
+            'phones': [],       # href of tel: links
+            'emails': [],       # href of mailto: links
+            'services': []      # one list of <li> innerHTML per Services/Products parent
+        }
+
+    def text_nodes(self, soup, words):
+        """Yield elements owning a text node that contains any of words"""
+        seen = set()
+        for string in soup.find_all(string=lambda s: any(w in s for w in words)):
+            if isinstance(string, Comment):
+                continue
+            elem = string.parent
+            if elem is None or elem.name in NON_VISIBLE_TAGS or id(elem) in seen:
+                continue
+            seen.add(id(elem))
+            yield elem
+
+    def extract_payload(self, soup):
+        """Collect the same pieces as the Selenium path from a parsed DOM"""
+        payload = self.empty_payload()
+
+        for section in soup.select(CONTACT_SELECTOR):
+            payload['sections'].append(section.get_text('\n').strip())
+
+        for elem in self.text_nodes(soup, ('Add',)):
+            if elem.parent is not None:
+                payload['addresses'].append(elem.parent.decode_contents())
+
+        for link in soup.select('a[href*="tel:"]'):
+            payload['phones'].append(link.get('href', ''))
+
+        for link in soup.select('a[href*="mailto:"]'):
+            payload['emails'].append(link.get('href', ''))
+
+        for elem in self.text_nodes(soup, ('Services', 'Products')):
+            if elem.parent is not None:
+                payload['services'].append(
+                    [item.decode_contents() for item in elem.parent.find_all('li')]
+                )
+
+        return payload
+
+    def looks_js_rendered(self, html, soup):
+        """Guess whether the page content is produced by JavaScript"""
+        visible = ' '.join(
+            s.strip() for s in soup.find_all(string=True)
+            if s.parent is not None and s.parent.name not in NON_VISIBLE_TAGS
+            and not isinstance(s, Comment) and s.strip()
+        )
+        if len(visible) < 200:
+            return True
+        lower = html.lower()
+        return len(visible) < 2000 and any(marker in lower for marker in JS_APP_MARKERS)
+
+    def has_contact_details(self, contact_info):
+        """Whether a record holds anything beyond name and website"""
+        return any(contact_info.get(k) for k in ('emails', 'phone_numbers', 'address'))
+
+    def build_contact_info(self, payload):
+        """Turn raw page pieces into a contractor record"""
+        contact_info = {}
+
+        # Process all text content
+        all_text = ""
+        for text in payload['sections']:
+            all_text += text + "\n"
+
+        for html in payload['addresses']:
+            address_text = self.clean_html(html)
+            if 'Add' in address_text or 'Address' in address_text:
+                all_text += address_text + "\n"
+
+        for href in payload['phones']:
+            all_text += href.replace('tel:', '').strip() + "\n"
+
+        for href in payload['emails']:
+            all_text += href.replace('mailto:', '').strip() + "\n"
+
+        # Clean up the text
+        all_text = self.clean_html(all_text)
+
+        # Find emails, phones and places in one pass over the text
+        entities = self.extractor.extract(all_text)
+        if entities['emails']:
+            contact_info['emails'] = entities['emails']
+
+        if entities['phone_numbers']:
+            contact_info['phone_numbers'] = entities['phone_numbers']
+
+        location_info = entities['location']
+        if location_info:
+            # Clean up address
+            if 'address' in location_info:
+                location_info['address'] = extraction.clean_address(location_info['address'])
+            contact_info.update(location_info)
+
+        # Get company name
+        contact_info['name'] = "Capricorn Logistics"
+        contact_info['website'] = self.url
+
+        products = []
+        seen = set()
+        for items in payload['services']:
+            for item in items:
+                product = self.clean_html(item)
+                if product and product.lower() not in seen:
+                    seen.add(product.lower())
+                    products.append(product)
+
+        if products:
+            contact_info['products'] = products
+
+        # Clean up empty values
+        return {k: v for k, v in contact_info.items() if v}
+
+    def scrape_static(self):
+        """Scrape the page over plain HTTP, or return None to fall back to Selenium"""
+        entry = self.cache.get(self.url) if self.cache is not None else None
+        headers = dict(self.headers)
+        if entry and entry['record'] is not None:
+            headers.update(self.cache.conditional_headers(entry))
+
+        # Fetched already while finding the site's pages, unless it answered
+        # 304 and the cached record has expired since
+        response = self.response
+        if response is not None and response.status_code == 304 and 'If-None-Match' not in headers \
+                and 'If-Modified-Since' not in headers:
+            response = None
 
-    def scrape_data(self):
-        """Scrape contractor data"""
         try:
-            print("Accessing website...")
-            self.driver.get(self.url)
-            self.random_sleep(3, 5)
-
-            # Wait for page to load
-            self.wait_and_find_element(By.TAG_NAME, 'body')
-            
-            # Extract data from the page
-            print("Extracting data...")
-            
-            # For Capricorn Logistics, look for specific contact information
-            contact_info = {}
-            
-            # Find the contact information section
-            contact_sections = self.wait_and_find_elements(
-                By.CSS_SELECTOR,
-                '.contact-info, .contact-details, .contact-us, #contact'
-            )
-            
-            # Process all text content
-            all_text = ""
-            for section in contact_sections:
-                all_text += self.extract_text(section) + "\n"
-            
-            # Get specific elements
-            address_elements = self.wait_and_find_elements(
-                By.XPATH,
-                "//*[contains(text(), 'Add') or contains(text(), 'Address')]"
-            )
-            
-            for elem in address_elements:
-                try:
-                    parent = elem.find_element(By.XPATH, './..')
-                    address_text = self.clean_html(parent.get_attribute('innerHTML'))
-                    if 'Add' in address_text or 'Address' in address_text:
-                        all_text += address_text + "\n"
-                except:
-                    continue
-            
-            # Get phone numbers specifically
-            phone_elements = self.wait_and_find_elements(
-                By.XPATH,
-                "//a[contains(@href, 'tel:')]"
-            )
-            
-            for elem in phone_elements:
-                try:
-                    phone = elem.get_attribute('href').replace('tel:', '').strip()
-                    all_text += phone + "\n"
-                except:
-                    continue
-            
-            # Get email addresses specifically
-            email_elements = self.wait_and_find_elements(
-                By.XPATH,
-                "//a[contains(@href, 'mailto:')]"
-            )
-            
-            for elem in email_elements:
+            if response is None:
+                print("Fetching page over HTTP...")
+                from http_client import shared_client
+                http = self.http or shared_client()
+                with self.metrics.span('fetch', self.url):
+                    response = http.get(self.url, headers=headers, timeout=self.static_timeout)
+            retries = getattr(getattr(response, 'raw', None), 'retries', None)
+            if retries is not None and retries.history:
+                self.metrics.count('retries', len(retries.history))
+            if response.status_code == 304 and entry and entry['record'] is not None:
+                print("Page not modified, reusing cached record")
+                self.metrics.count('not_modified')
+                self.cache.touch(self.url)
+                self.from_cache = True
+                return entry['record']
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Static fetch failed: {str(e)}")
+            return None
+
+        self.validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'digest': content_hash(response.content)
+        }
+        if entry and entry['record'] is not None and entry['content_hash'] == self.validators['digest']:
+            print("Page content unchanged, reusing cached record")
+            self.metrics.count('unchanged')
+            self.cache.touch(self.url, self.validators['etag'], self.validators['last_modified'])
+            self.from_cache = True
+            return entry['record']
+
+        if 'html' not in response.headers.get('Content-Type', 'text/html').lower():
+            print("Response is not HTML, falling back to browser")
+            return None
+
+        html = response.text
+        if self.archive is not None:
+            with self.metrics.span('archive', self.url):
+                self.archive.append(self.url, response.content, kind='static')
+        with self.metrics.span('parse', self.url, bytes=len(response.content)):
+            if self.parser is not None:
+                # Parse in a worker process so this thread can go back to fetching
+                contact_info, reason = self.parser.parse(self.url, html)
+            else:
+                contact_info, reason = self.parse_static(html)
+        if contact_info is None:
+            print(reason)
+        return contact_info
+
+    def parse_static(self, html, rendered=False):
+        """Turn fetched HTML into a record, returning (record, None) or (None, reason)
+
+        rendered marks HTML taken from the browser, which is parsed as it is
+        rather than being sent back to the browser.
+        """
+        soup = BeautifulSoup(html, 'html.parser')
+        if not rendered and self.looks_js_rendered(html, soup):
+            return None, "Page looks JavaScript-rendered, falling back to browser"
+
+        contact_info = self.build_contact_info(self.extract_payload(soup))
+        if not self.has_contact_details(contact_info):
+            return None, "No contact details in static HTML, falling back to browser"
+        return contact_info, None
+
+    def scrape_dynamic(self):
+        """Scrape the page in a Selenium browser"""
+        from selenium.common.exceptions import TimeoutException
+
+        if self.driver is None:
+            self.setup_driver()
+
+        print("Accessing website...")
+        started = time.monotonic()
+        self.driver.set_page_load_timeout(self.page_budget)
+        if self.capture_xhr:
+            # Only responses of this page should be looked at
+            drain_network_log(self.driver)
+        try:
+            with self.metrics.span('navigate', self.url):
+                self.driver.get(self.url)
+        except TimeoutException:
+            # Use whatever has rendered once the budget runs out
+            print("Page load hit the page budget, extracting what has rendered")
+            self.metrics.count('page_budget_timeouts')
+            self.driver.execute_script('window.stop();')
+
+        # Wait once for the page to settle, within what is left of the page budget
+        remaining = max(0.0, self.page_budget - (time.monotonic() - started))
+        with self.metrics.span('wait', self.url):
+            waited = self.wait_for_page_ready(remaining)
+        print(f"Page ready after {time.monotonic() - started:.1f}s ({waited:.1f}s waiting)")
+
+        # Extract data from the page
+        print("Extracting data...")
+        payload = None
+        with self.metrics.span('dom_extract', self.url):
+            if self.batch_extract:
                 try:
-                    email = elem.get_attribute('href').replace('mailto:', '').strip()
-                    all_text += email + "\n"
-                except:
-                    continue
-            
-            # Clean up the text
-            all_text = self.clean_html(all_text)
-            
-            # Extract emails
-            emails = self.extract_emails(all_text)
-            if emails:
-                contact_info['emails'] = emails
-            
-            # Extract phone numbers
-            phones = self.extract_phone_numbers(all_text)
-            if phones:
-                contact_info['phone_numbers'] = phones
-            
-            # Extract location details
-            location_info = self.extract_location_details(all_text)
-            if location_info:
-                # Clean up address
-                if 'address' in location_info:
-                    address = location_info['address']
-                    # Remove common prefixes
-                    address = re.sub(r'^.*?(?:Address|Add|Location)[:\s]*', '', address, flags=re.IGNORECASE)
-                    # Clean up the address
-                    address = re.sub(r'\s+', ' ', address).strip()
-                    location_info['address'] = address
-                contact_info.update(location_info)
-            
-            # Get company name
-            contact_info['name'] = "Capricorn Logistics"
-            contact_info['website'] = self.url
-            
-            # Try to find products/services
-            services_sections = self.wait_and_find_elements(
-                By.XPATH,
-                '//*[contains(text(), "Services") or contains(text(), "Products")]'
-            )
-            
-            products = []
-            for section in services_sections:
+                    payload = self.extract_payload_batched()
+                except Exception as e:
+                    print(f"Batched extraction failed, reading elements one by one: {str(e)}")
+                    self.metrics.count('batch_extract_fallbacks')
+            if payload is None:
+                payload = self.extract_payload_elementwise()
+
+        if self.archive is not None:
+            with self.metrics.span('archive', self.url):
                 try:
-                    parent = section.find_element(By.XPATH, './..')
-                    items = parent.find_elements(By.TAG_NAME, 'li')
-                    for item in items:
-                        product = self.clean_html(item.get_attribute('innerHTML'))
-                        if product and not any(p.lower() == product.lower() for p in products):
-                            products.append(product)
-                except:
-                    continue
-            
-            if products:
-                contact_info['products'] = products
-            
-            # Clean up empty values
-            contact_info = {k: v for k, v in contact_info.items() if v}
-            
-            if contact_info:
-                print(f"Found contractor: {contact_info.get('name', 'Unknown')}")
-                self.contractors.append(contact_info)
-            
-            print(f"Found {len(self.contractors)} contractors")
-            return self.contractors
-            
+                    self.archive.append(self.url, self.driver.page_source, kind='rendered')
+                except Exception as e:
+                    print(f"Could not archive rendered page: {str(e)}")
+
+        if self.capture_xhr:
+            with self.metrics.span('xhr_extract', self.url):
+                captured = captured_json(self.driver)
+                documents = [data for url, method, data in captured]
+                texts, self.api_records = self.records_from_json(documents)
+                payload['sections'].extend(texts)
+                # Only plain GETs can be replayed without the page's state
+                self.learned_endpoints = [
+                    url for url, method, data in captured
+                    if method == 'GET' and contact_objects(data)
+                ]
+            if self.api_records:
+                print(f"Found {len(self.api_records)} contact entries in JSON responses")
+
+        with self.metrics.span('build_record', self.url):
+            return self.build_contact_info(payload)
+
+    def records_from_json(self, documents):
+        """Text of every contact entry in the JSON documents, and a record per entry"""
+        texts = []
+        records = []
+        for data in documents:
+            for obj in contact_objects(data):
+                text = '\n'.join(flatten(obj))
+                texts.append(text)
+                payload = self.empty_payload()
+                payload['sections'].append(text)
+                record = self.build_contact_info(payload)
+                if self.has_contact_details(record):
+                    records.append(record)
+        return texts, records
+
+    def replay_endpoints(self, endpoints):
+        """Fetch learned JSON endpoints over HTTP, returning the documents that still hold contacts"""
+        from http_client import shared_client
+        http = self.http or shared_client()
+        documents = []
+        for endpoint in endpoints:
+            try:
+                with self.metrics.span('replay', endpoint):
+                    response = http.get(endpoint, headers=self.headers, timeout=self.static_timeout)
+                    response.raise_for_status()
+            except Exception as e:
+                print(f"Replaying {endpoint} failed: {str(e)}")
+                continue
+            data = parse_json(response.text)
+            if data is not None and contact_objects(data):
+                documents.append(data)
+        return documents
+
+    def scrape_api(self):
+        """Build the record from endpoints learned on an earlier run, or return None"""
+        if self.cache is None:
+            return None
+        endpoints = self.cache.endpoints(self.url)
+        if not endpoints:
+            return None
+        documents = self.replay_endpoints(endpoints)
+        if not documents:
+            # The API moved or changed shape; learn it again in the browser
+            self.cache.forget_endpoints(self.url)
+            return None
+
+        texts, self.api_records = self.records_from_json(documents)
+        payload = self.empty_payload()
+        payload['sections'].extend(texts)
+        contact_info = self.build_contact_info(payload)
+        if not self.has_contact_details(contact_info):
+            return None
+        print(f"Rebuilt record from {len(documents)} known JSON endpoints")
+        self.metrics.count('api_replays')
+        return contact_info
+
+    def extract_payload_batched(self):
+        """Collect the page pieces with a single in-page script"""
+        payload = self.empty_payload()
+        result = self.driver.execute_script(
+            BATCH_EXTRACTION_SCRIPT,
+            CONTACT_SELECTOR, ADDRESS_XPATH, PHONE_XPATH, EMAIL_XPATH, SERVICES_XPATH
+        ) or {}
+        for key in payload:
+            payload[key] = [value for value in result.get(key) or [] if value is not None]
+        return payload
+
+    def extract_payload_elementwise(self):
+        """Collect the page pieces element by element through WebDriver"""
+        from selenium.webdriver.common.by import By
+
+        payload = self.empty_payload()
+
+        # Find the contact information section
+        contact_sections = self.find_elements_now(By.CSS_SELECTOR, CONTACT_SELECTOR)
+        for section in contact_sections:
+            payload['sections'].append(self.extract_text(section))
+
+        # Get specific elements
+        address_elements = self.find_elements_now(By.XPATH, ADDRESS_XPATH)
+
+        for elem in address_elements:
+            try:
+                parent = elem.find_element(By.XPATH, './..')
+                payload['addresses'].append(parent.get_attribute('innerHTML'))
+            except:
+                continue
+
+        # Get phone numbers specifically
+        phone_elements = self.find_elements_now(By.XPATH, PHONE_XPATH)
+
+        for elem in phone_elements:
+            try:
+                payload['phones'].append(elem.get_attribute('href'))
+            except:
+                continue
+
+        # Get email addresses specifically
+        email_elements = self.find_elements_now(By.XPATH, EMAIL_XPATH)
+
+        for elem in email_elements:
+            try:
+                payload['emails'].append(elem.get_attribute('href'))
+            except:
+                continue
+
+        # Try to find products/services
+        services_sections = self.find_elements_now(By.XPATH, SERVICES_XPATH)
+
+        for section in services_sections:
+            try:
+                parent = section.find_element(By.XPATH, './..')
+                items = parent.find_elements(By.TAG_NAME, 'li')
+                payload['services'].append([item.get_attribute('innerHTML') for item in items])
+            except:
+                continue
+
+        return payload
+
+    def scrape_data(self):
+        """Scrape contractor data"""
+        self.metrics.count('pages')
+        try:
+            with self.metrics.span('page', self.url):
+                return self.scrape_page()
         except Exception as e:
+            # Kept so callers can tell a failed page from one without contacts
             print(f"Error during scraping: {str(e)}")
+            self.metrics.count('failures')
+            self.error = e
             return []
         finally:
-            self.driver.quit()
+            self.close()
+
+    def scrape_page(self):
+        """Scrape, cache and output the record of this page"""
+        contact_info = None
+        if self.use_static:
+            contact_info = self.scrape_static()
+        if contact_info is None:
+            contact_info = self.scrape_api()
+        elif self.cache is not None:
+            # Branch records come from the page's JSON API and are not cached,
+            # so fetch them again whether or not the page itself changed
+            endpoints = self.cache.endpoints(self.url)
+            if endpoints:
+                self.api_records = self.records_from_json(self.replay_endpoints(endpoints))[1]
+        if contact_info is None and self.use_browser:
+            if self.use_static:
+                self.metrics.count('browser_fallbacks')
+            contact_info = self.scrape_dynamic()
+            if self.cache is not None and self.learned_endpoints:
+                self.cache.learn_endpoints(self.url, self.learned_endpoints)
+        elif self.from_cache:
+            self.metrics.count('cache_hits')
+        elif contact_info is not None:
+            self.metrics.count('static_pages')
+
+        # The validators come from the static fetch, so a page that
+        # needed the browser can still be skipped on the next run
+        if self.cache is not None and not self.from_cache and self.validators:
+            self.cache.store(self.url, contact_info, **self.validators)
+
+        if contact_info:
+            print(f"Found contractor: {contact_info.get('name', 'Unknown')}")
+            self.contractors.append(contact_info)
+            if self.sink is not None:
+                with self.metrics.span('output', self.url):
+                    self.sink.write(contact_info)
+
+        # Offices and branches found in JSON responses are records of their own
+        for record in self.api_records:
+            self.contractors.append(record)
+            if self.sink is not None:
+                self.sink.write(record)
+
+        print(f"Found {len(self.contractors)} contractors")
+        return self.contractors
 
     def extract_emails(self, text):
         """Extract email addresses"""
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        return list(set(re.findall(email_pattern, text)))
+        return self.extractor.extract_emails(text)
 
     def extract_phone_numbers(self, text):
         """Extract phone numbers"""
-        patterns = [
-            r'(?:\+91|0)?[-\s]?\d{10}',  # Indian mobile
-            r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}',  # XXX-XXX-XXXX
-            r'\d{4}[-.\s]?\d{3}[-.\s]?\d{3}',  # XXXX-XXX-XXX
-            r'\+\d{1,3}[-.\s]?\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'  # International
-        ]
-        
-        phones = set()
-        for pattern in patterns:
-            matches = re.findall(pattern, text)
-            phones.update(matches)
-        
-        # Clean up phone numbers
-        cleaned_phones = set()
-        for phone in phones:
-            # Remove all non-digit characters
-            digits = re.sub(r'\D', '', phone)
-            # Add back the plus sign for international numbers
-            if len(digits) > 10:
-                cleaned_phones.add('+' + digits)
-            else:
-                cleaned_phones.add(digits)
-        
-        return list(cleaned_phones)
+        return self.extractor.extract_phone_numbers(text)
 
     def extract_location_details(self, text):
         """Extract location details"""
-        location_info = {}
-        
-        # Extract address first
-        address_pattern = r'(?i)(?:address|location)[:\s]*(.*?)(?:\n|$)'
-        address_match = re.search(address_pattern, text)
-        if address_match:
-            location_info['address'] = address_match.group(1).strip()
-        
-        # Extract pincode
-        pincode_match = re.search(r'\b\d{6}\b', text)
-        if pincode_match:
-            location_info['pincode'] = pincode_match.group()
-        
-        # Common Indian cities and states
-        cities = ['Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Kolkata', 
-                 'Pune', 'Ahmedabad', 'Surat', 'Jaipur', 'Lucknow', 'Kanpur']
-        
-        states = ['Maharashtra', 'Delhi', 'Karnataka', 'Telangana', 'Tamil Nadu', 
-                 'West Bengal', 'Gujarat', 'Rajasthan', 'Uttar Pradesh', 'Kerala']
-        
-        # Find city and state
-        for city in cities:
-            if re.search(rf'\b{city}\b', text, re.IGNORECASE):
-                location_info['city'] = city
-                break
-        
-        for state in states:
-            if re.search(rf'\b{state}\b', text, re.IGNORECASE):
-                location_info['state'] = state
-                break
-        
-        location_info['country'] = 'India'
-        
-        return location_info
+        return self.extractor.extract_location_details(text)
 
     def save_to_csv(self, data, filename='logistics_contractors.csv'):
         """Save data to CSV"""
@@ -342,46 +683,18 @@ class LogisticsContractorScraper:
 
     def generate_insights(self, data):
         """Generate insights from data"""
-        insights = {
-            'total_contractors': len(data),
-            'contact_stats': {
-                'with_email': sum(1 for item in data if item.get('emails')),
-                'with_phone': sum(1 for item in data if item.get('phone_numbers')),
-                'with_website': sum(1 for item in data if item.get('website'))
-            },
-            'locations': {
-                'cities': {},
-                'states': {}
-            },
-            'products': {}
-        }
-        
-        for item in data:
-            # Location statistics
-            if 'city' in item:
-                city = item['city']
-                insights['locations']['cities'][city] = insights['locations']['cities'].get(city, 0) + 1
-            
-            if 'state' in item:
-                state = item['state']
-                insights['locations']['states'][state] = insights['locations']['states'].get(state, 0) + 1
-            
-            # Product statistics
-            if 'products' in item:
-                products = item['products'] if isinstance(item['products'], list) else [item['products']]
-                for product in products:
-                    insights['products'][product] = insights['products'].get(product, 0) + 1
-        
-        return insights
+        return InsightAggregator().update(data).insights()
 
 def main():
     url = "https://www.allcargologistics.com/"
     
-    scraper = LogisticsContractorScraper(url)
     print("Starting data extraction...")
     
-    data = scraper.scrape_data()
-    scraper.save_to_csv(data)
+    # Records are written as they are found rather than at the end
+    with RecordSink('logistics_contractors.csv', resume=False) as sink:
+        scraper = LogisticsContractorScraper(url, sink=sink)
+        data = scraper.scrape_data()
+    print(f"Data saved to {sink.path}")
     
     insights = scraper.generate_insights(data)
     print("\nInsights:")
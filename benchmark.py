@@ -0,0 +1,349 @@
+"""Benchmark the scraper against a generated corpus of local dealer sites
+
+    python benchmark.py [--sites 40] [--browser] [--json results.json]
+
+Every site is served from one local HTTP server under its own host name
+(dealer0.localhost, dealer1.localhost, ...) so per-host politeness treats
+them as different domains. Static fetches reach the server as their HTTP
+proxy and Chrome resolves .localhost names to the loopback address itself,
+so any number of sites works without DNS or extra loopback addresses on
+any platform. The corpus mixes static contact pages, JavaScript-
+rendered pages, pages with hundreds of tel:/mailto: links and pages without
+any of the contact selectors. Without --browser the JavaScript-rendered
+sites are only used where no browser is needed, and no page is ever
+rendered in one.
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+import os
+import resource
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from dedup import normalize_phone
+from extraction import DEFAULT_CITIES, DEFAULT_EXTRACTOR, DEFAULT_STATES, clean_html
+
+SITE_KINDS = ('static', 'js', 'many_links', 'no_selectors')
+
+STREETS = ['MG Road', 'Station Road', 'Ring Road', 'Industrial Estate', 'Link Road', 'Ashram Road']
+SERVICES = ['Freight Forwarding', 'Warehousing', 'Customs Clearance', 'Cold Chain',
+            'Express Parcel', 'Project Cargo', 'Rail Freight', 'Last Mile Delivery']
+
+
+def make_dealer(index, rng):
+    """Ground truth for one synthetic dealer"""
+    city = rng.choice(DEFAULT_CITIES)
+    return {
+        'name': f"Dealer {index} Logistics",
+        'domain': f"dealer{index}.example",
+        'emails': [f"info@dealer{index}.example", f"sales.{index}@dealer{index}.example"],
+        'phones': [f"9{rng.randrange(10 ** 8, 10 ** 9)}" for _ in range(2)],
+        'pincode': str(rng.randrange(110001, 855999)),
+        'city': city,
+        'state': rng.choice(DEFAULT_STATES),
+        'street': f"{rng.randrange(1, 400)}, {rng.choice(STREETS)}",
+        'services': rng.sample(SERVICES, 4),
+    }
+
+
+def contact_block(dealer):
+    """Address, phone and email markup shared by the page kinds"""
+    phones = ''.join(f'<a href="tel:+91{p}">+91-{p}</a><br>' for p in dealer['phones'])
+    emails = ''.join(f'<a href="mailto:{e}">{e}</a><br>' for e in dealer['emails'])
+    return (
+        f"<p><strong>Address:</strong> {dealer['street']}, {dealer['city']}, "
+        f"{dealer['state']} - {dealer['pincode']}</p>{phones}{emails}"
+    )
+
+
+def filler(rng, words=400):
+    """Paragraphs of text so pages are not trivially small"""
+    vocab = ['logistics', 'cargo', 'shipment', 'network', 'customers', 'delivery', 'India',
+             'trusted', 'partners', 'solutions', 'supply', 'chain', 'fleet', 'tracking']
+    return '<p>' + ' '.join(rng.choice(vocab) for _ in range(words)) + '</p>'
+
+
+def render_page(dealer, kind, rng):
+    """HTML of a dealer's contact page of the given kind"""
+    services = '<h3>Services</h3><ul>' + ''.join(f'<li>{s}</li>' for s in dealer['services']) + '</ul>'
+    if kind == 'js':
+        # Everything visible is injected by script, as with client-side apps
+        payload = json.dumps('<div class="contact-info">' + contact_block(dealer) + '</div>' + services)
+        return (
+            '<html><head><title>Contact</title></head><body><div id="root"></div>'
+            f'<script>document.getElementById("root").innerHTML = {payload};</script></body></html>'
+        )
+    if kind == 'no_selectors':
+        body = filler(rng) + '<div class="footer-col">' + contact_block(dealer) + '</div>' + services
+    elif kind == 'many_links':
+        extra = ''.join(
+            f'<a href="tel:+91{dealer["phones"][i % 2]}">Branch {i}</a> '
+            f'<a href="mailto:{dealer["emails"][i % 2]}">Mail branch {i}</a><br>'
+            for i in range(300)
+        )
+        body = filler(rng) + '<div class="contact-info">' + contact_block(dealer) + extra + '</div>' + services
+    else:
+        body = filler(rng) + '<div class="contact-info">' + contact_block(dealer) + '</div>' + services
+    return f'<html><head><title>{dealer["name"]}</title></head><body><h1>{dealer["name"]}</h1>{body}</body></html>'
+
+
+def build_corpus(sites, seed=0):
+    """Return (dealers, pages) where pages maps host -> path -> HTML"""
+    rng = random.Random(seed)
+    dealers = []
+    pages = {}
+    for index in range(sites):
+        dealer = make_dealer(index, rng)
+        dealer['kind'] = SITE_KINDS[index % len(SITE_KINDS)]
+        dealer['host'] = f"dealer{index}.localhost"
+        dealers.append(dealer)
+        home = (
+            f'<html><body><h1>{dealer["name"]}</h1>{filler(rng, 200)}'
+            '<a href="/about">About</a> <a href="/careers">Careers</a> '
+            '<a href="/contact-us">Contact Us</a></body></html>'
+        )
+        pages[dealer['host']] = {
+            '/': home,
+            '/contact-us': render_page(dealer, dealer['kind'], rng),
+            '/about': '<html><body>' + filler(rng) + '</body></html>',
+        }
+    return dealers, pages
+
+
+class CorpusServer:
+    def __init__(self, pages, port=0):
+        """Serve the corpus, choosing the site by the requested host name"""
+        def handler_factory(*args, **kwargs):
+            return CorpusHandler(pages, *args, **kwargs)
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler_factory)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, host, path='/'):
+        return f"http://{host}:{self.port}{path}"
+
+    def route(self, client):
+        """Send an HttpClient's requests for every site through this server"""
+        client.session.proxies = {'http': f"http://127.0.0.1:{self.port}"}
+        # A NO_PROXY covering localhost must not send them past it
+        client.session.trust_env = False
+        return client
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class CorpusHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, pages, *args, **kwargs):
+        self.pages = pages
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        # Proxied requests carry the whole URL, direct ones (Chrome's) a path
+        target = urlsplit(self.path)
+        host = target.hostname or self.headers.get('Host', '').split(':')[0]
+        body = self.pages.get(host, {}).get(target.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process and its finished children"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / 1024, 1)
+
+
+def accuracy(dealers, records):
+    """Share of true emails, phones, pincodes and cities that were extracted"""
+    by_domain = {}
+    for record in records:
+        host = (record.get('website') or '').split('//')[-1].split(':')[0].split('/')[0]
+        by_domain.setdefault(host, []).append(record)
+
+    found = {'emails': 0, 'phones': 0, 'pincode': 0, 'city': 0}
+    totals = {'emails': 0, 'phones': 0, 'pincode': 0, 'city': 0}
+    for dealer in dealers:
+        got = by_domain.get(dealer['host'], [])
+        emails = {e for r in got for e in r.get('emails') or []}
+        phones = {normalize_phone(p) for r in got for p in r.get('phone_numbers') or []}
+        totals['emails'] += len(dealer['emails'])
+        found['emails'] += len(set(dealer['emails']) & emails)
+        totals['phones'] += len(dealer['phones'])
+        found['phones'] += len(set(dealer['phones']) & phones)
+        totals['pincode'] += 1
+        found['pincode'] += any(r.get('pincode') == dealer['pincode'] for r in got)
+        totals['city'] += 1
+        found['city'] += any(r.get('city') == dealer['city'] for r in got)
+    return {key: round(found[key] / totals[key], 3) if totals[key] else None for key in totals}
+
+
+def summarize(name, latencies, elapsed, dealers, records):
+    return {
+        'benchmark': name,
+        'pages': len(latencies),
+        'pages_per_sec': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'accuracy': accuracy(dealers, records),
+    }
+
+
+def bench_extraction(dealers, rounds=20):
+    """clean_html and the extractor over every dealer's contact block"""
+    texts = [(dealer, contact_block(dealer)) for dealer in dealers]
+    latencies = []
+    records = []
+    started = time.perf_counter()
+    for round_ in range(rounds):
+        for dealer, text in texts:
+            t0 = time.perf_counter()
+            entities = DEFAULT_EXTRACTOR.extract(clean_html(text))
+            latencies.append(time.perf_counter() - t0)
+            if round_ == 0:
+                record = dict(entities['location'])
+                record.update(website=f"http://{dealer['host']}/",
+                              emails=entities['emails'], phone_numbers=entities['phone_numbers'])
+                records.append(record)
+    return summarize('extraction', latencies, time.perf_counter() - started, dealers, records)
+
+
+def bench_scraper(dealers, server, browser):
+    """LogisticsContractorScraper on every contact page"""
+    from WebScrap import LogisticsContractorScraper
+    from http_client import HttpClient
+    http = server.route(HttpClient(rate=None))
+    latencies = []
+    records = []
+    started = time.perf_counter()
+    for dealer in dealers:
+        url = server.url(dealer['host'], '/contact-us')
+        scraper = LogisticsContractorScraper(url, http=http, use_browser=browser)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if browser:
+                found = scraper.scrape_data()
+            else:
+                record = scraper.scrape_static()
+                found = [record] if record else []
+        latencies.append(time.perf_counter() - t0)
+        records.extend(found)
+    http.close()
+    return summarize('scraper', latencies, time.perf_counter() - started, dealers, records)
+
+
+def bench_finder(dealers, server, browser, max_workers):
+    """LogisticsFinder.scrape_companies over the corpus sites, timed per page and per site"""
+    from crawl_metrics import CrawlMetrics
+    from logistics_finder import LogisticsFinder
+    sites = [d for d in dealers if browser or d['kind'] != 'js']
+    with tempfile.TemporaryDirectory() as spans_dir:
+        # The per-page latencies are read back from the 'page' spans
+        spans_path = os.path.join(spans_dir, 'spans.jsonl')
+        metrics = CrawlMetrics(spans_path=spans_path)
+        # Without a browser the finder must stay on HTTP, or the site crawl's
+        # pages without contacts would still start Selenium
+        finder = LogisticsFinder(max_workers=max_workers, cache_path=None, use_browser=browser, metrics=metrics)
+        server.route(finder.http)
+        finder.known_companies = [server.url(d['host']) for d in sites]
+        finder.search_queries = []
+        finder.scheduler.delay = None
+        finder.page_scheduler.delay = None
+        finder.http.rate = None
+
+        site_latencies = []
+        scrape_company = finder.scrape_company
+
+        def timed(url):
+            t0 = time.perf_counter()
+            try:
+                return scrape_company(url)
+            finally:
+                site_latencies.append(time.perf_counter() - t0)
+
+        finder.scrape_company = timed
+        started = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                records = finder.scrape_companies()
+        finally:
+            finder.close()
+            metrics.close()
+        elapsed = time.perf_counter() - started
+        with open(spans_path, encoding='utf-8') as f:
+            latencies = [span['seconds'] for span in map(json.loads, f) if span['stage'] == 'page']
+
+    result = summarize('finder', latencies, elapsed, sites, records)
+    result.update(
+        sites=len(site_latencies),
+        p50_site_ms=round(percentile(site_latencies, 50) * 1000, 2) if site_latencies else None,
+        p95_site_ms=round(percentile(site_latencies, 95) * 1000, 2) if site_latencies else None,
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sites', type=int, default=40, help='number of synthetic dealer sites')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=4, help='LogisticsFinder max_workers')
+    parser.add_argument('--browser', action='store_true', help='allow the Selenium fallback')
+    parser.add_argument('--only', choices=('extraction', 'scraper', 'finder'), action='append')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    dealers, pages = build_corpus(args.sites, args.seed)
+    only = set(args.only or ('extraction', 'scraper', 'finder'))
+    results = []
+    with CorpusServer(pages) as server:
+        if 'extraction' in only:
+            results.append(bench_extraction(dealers))
+        if 'scraper' in only:
+            results.append(bench_scraper(dealers, server, args.browser))
+        if 'finder' in only:
+            results.append(bench_finder(dealers, server, args.browser, args.workers))
+
+    for result in results:
+        print(json.dumps(result))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
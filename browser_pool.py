@@ -0,0 +1,265 @@
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+MASK_AUTOMATION_SCRIPT = '''
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5]
+    });
+    window.chrome = {
+        runtime: {}
+    };
+'''
+
+
+# Heavy resources a contact scrape never needs; blocked over CDP in lean mode
+BLOCKED_RESOURCES = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    '*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.ogg', '*.avi', '*.mov'
+]
+
+DRIVER_CACHE_FILE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'logistics-scraper', 'chromedriver.json'
+)
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path(cache_file=DRIVER_CACHE_FILE, refresh=False):
+    """Path of the chromedriver binary, resolved once per process
+
+    CHROMEDRIVER_PATH wins if set. Otherwise a path remembered in
+    cache_file is reused while the binary still exists, so no network
+    access is needed; only when neither works is ChromeDriverManager asked
+    to install one, and its answer is remembered. refresh skips the
+    remembered path, for a driver that no longer fits the installed Chrome.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if refresh:
+            _driver_path = None
+        if _driver_path and os.path.exists(_driver_path):
+            return _driver_path
+
+        path = os.environ.get('CHROMEDRIVER_PATH')
+        if not path and cache_file and not refresh:
+            try:
+                with open(cache_file, encoding='utf-8') as f:
+                    path = json.load(f).get('path')
+            except (OSError, ValueError):
+                path = None
+        if not path or not os.path.exists(path):
+            from webdriver_manager.chrome import ChromeDriverManager
+            path = ChromeDriverManager().install()
+            if cache_file:
+                try:
+                    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                    with open(cache_file, 'w', encoding='utf-8') as f:
+                        json.dump({'path': path}, f)
+                except OSError:
+                    pass
+
+        _driver_path = path
+        return path
+
+
+def create_driver(user_agent=USER_AGENT, page_load_timeout=60, lean=True, capture_network=False):
+    """Launch a Chrome WebDriver with automation masking applied
+
+    With lean the browser runs headless, returns from get() once the DOM
+    is ready rather than after every subresource, and never downloads
+    images, stylesheets, fonts or media. With capture_network, network
+    events go to the performance log so XHR/fetch responses can be read
+    back (see xhr_capture).
+    """
+    # Selenium is only loaded once a browser is actually wanted
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_argument('--disable-infobars')
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    if lean:
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-background-networking')
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2
+        })
+        chrome_options.page_load_strategy = 'eager'
+
+    if capture_network:
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', {
+            'enableNetwork': True, 'enablePage': False
+        })
+
+    # Add custom headers
+    chrome_options.add_argument(f'--user-agent={user_agent}')
+
+    from selenium.common.exceptions import SessionNotCreatedException
+
+    try:
+        driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=chrome_options)
+    except SessionNotCreatedException:
+        if os.environ.get('CHROMEDRIVER_PATH'):
+            raise
+        # Chrome updated itself past the remembered driver; install a matching one
+        print("Cached chromedriver does not match Chrome, installing a new one")
+        driver = webdriver.Chrome(service=Service(resolve_driver_path(refresh=True)), options=chrome_options)
+
+    # Set window size
+    driver.set_window_size(1920, 1080)
+    driver.set_page_load_timeout(page_load_timeout)
+
+    # Mask automation
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': MASK_AUTOMATION_SCRIPT
+    })
+    if lean or capture_network:
+        driver.execute_cdp_cmd('Network.enable', {})
+    if lean:
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCES})
+    return driver
+
+
+class BrowserPool:
+    def __init__(self, size=2, max_pages=25, user_agent=USER_AGENT, page_load_timeout=60, lean=True,
+                 capture_network=False):
+        """Keep up to size warm Chrome instances for reuse across sites
+
+        A driver is recycled after serving max_pages pages, or as soon as it
+        fails to reset between sites (which is how a crashed browser shows up).
+        lean and capture_network are passed on to create_driver.
+        """
+        self.size = size
+        self.max_pages = max_pages
+        self.user_agent = user_agent
+        self.page_load_timeout = page_load_timeout
+        self.lean = lean
+        self.capture_network = capture_network
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._closed = False
+
+    def _new_driver(self):
+        """Start a fresh browser and start counting its pages"""
+        driver = create_driver(self.user_agent, self.page_load_timeout, self.lean, self.capture_network)
+        with self._lock:
+            self._pages[id(driver)] = (driver, 0)
+        return driver
+
+    def _discard(self, driver):
+        """Quit a browser and forget about it"""
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def warm(self, count=None):
+        """Start browsers ahead of time so the first sites don't pay for startup"""
+        for _ in range(min(count or self.size, self.size) - self._idle.qsize()):
+            self._idle.put(self._new_driver())
+
+    def reset(self, driver):
+        """Clear cookies, storage, cache and extra windows left by the last site"""
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            try:
+                driver.execute_script('window.localStorage.clear(); window.sessionStorage.clear();')
+            except Exception:
+                pass
+            driver.delete_all_cookies()
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            driver.get('about:blank')
+            if self.capture_network:
+                # Don't hand the last site's network events to the next one
+                driver.get_log('performance')
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout=None):
+        """Take a warm browser from the pool, starting one if none is idle"""
+        if self._closed:
+            raise RuntimeError("Browser pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No browser available in the pool")
+        try:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                return self._new_driver()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, driver, broken=False):
+        """Return a browser to the pool, recycling it when worn out or broken"""
+        try:
+            with self._lock:
+                _, pages = self._pages.get(id(driver), (driver, 0))
+                pages += 1
+                self._pages[id(driver)] = (driver, pages)
+
+            if broken or self._closed or pages >= self.max_pages or not self.reset(driver):
+                self._discard(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """Borrow a browser for the duration of a with block"""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def close(self):
+        """Quit every browser the pool has started"""
+        self._closed = True
+        with self._lock:
+            drivers = [driver for driver, _ in self._pages.values()]
+        for driver in drivers:
+            self._discard(driver)
+        while not self._idle.empty():
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
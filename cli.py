@@ -0,0 +1,318 @@
+"""Command line entry point for crawling, extraction and exports
+
+    python cli.py discover [--seed-file quick_logistics_list.csv] [--query ...]
+    python cli.py crawl [--output all_logistics_companies.csv] [--workers 4]
+    python cli.py extract page.html [--url https://dealer.example/contact]
+    python cli.py export all_logistics_companies.csv dealers.sqlite3
+    python cli.py stats all_logistics_companies.csv
+    python cli.py reextract pages.archive records.csv
+    python cli.py coordinate --local-workers 4 [--output all_logistics_companies.csv]
+    python cli.py work --queue /shared/work_queue.sqlite3 [--worker-id box-2]
+    python cli.py merge --queue work_queue.sqlite3 all_logistics_companies.csv
+    python cli.py merge --input all_logistics_companies.csv dealers.csv
+
+Only the standard library is imported up front. Each command imports what
+it needs when it runs, and a browser is only started once a page or search
+actually needs one, so stats, export and extract start in a fraction of a
+second and never load Selenium.
+"""
+import argparse
+import json
+import os
+import sys
+
+
+def command_discover(args):
+    from discovery import SeedListSource, SeedFileSource, ListingPageSource, SearchSource, stream_sources
+    from page_cache import PageCache
+
+    if not (args.seed_file or args.url or args.listing or args.query):
+        args.seed_file = ['quick_logistics_list.csv']
+    sources = [SeedFileSource(path) for path in args.seed_file]
+    if args.url:
+        sources.append(SeedListSource(args.url))
+    if args.listing:
+        sources.append(ListingPageSource(args.listing))
+    pool = None
+    if args.query:
+        from browser_pool import BrowserPool
+        pool = BrowserPool(size=1)
+        sources.append(SearchSource(args.query, pool))
+
+    cache = PageCache(args.cache) if args.cache else None
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        feed = stream_sources(sources, cache=cache)
+        for url in iter(feed.get, None):
+            out.write(url + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if pool is not None:
+            pool.close()
+        if cache is not None:
+            cache.close()
+
+
+def command_crawl(args):
+    from crawl_metrics import CrawlMetrics
+    from logistics_finder import LogisticsFinder
+    from record_sink import RecordSink
+
+    metrics = CrawlMetrics(spans_path=args.spans)
+    finder = LogisticsFinder(max_workers=args.workers, metrics=metrics, cache_path=args.cache,
+                             parse_workers=args.parse_workers, frontier_path=args.frontier,
+                             insights_path=args.insights, archive_path=args.archive)
+    finder.seed_files = args.seed_file
+    if args.no_search:
+        finder.search_queries = []
+    try:
+        resuming = finder.begin_run(fresh=args.fresh)
+        with RecordSink(args.output, resume=resuming) as sink:
+            finder.stream_companies(sink)
+        print(f"Data saved to {args.output}")
+        if not args.no_merge:
+            from dedup import merge_file
+            root, ext = os.path.splitext(args.output)
+            merged = args.merged or f"{root}_merged{ext}"
+            print(f"Merged {merge_file(args.output, merged)} dealers into {merged}")
+        finder.print_summary()
+    finally:
+        finder.close()
+        if args.prometheus:
+            metrics.write_prometheus(args.prometheus)
+        metrics.close()
+
+
+def command_extract(args):
+    from WebScrap import LogisticsContractorScraper
+
+    extractor = None
+    if args.gazetteer:
+        from extraction import ContactExtractor
+        extractor = ContactExtractor.from_gazetteer(args.gazetteer)
+    for path in args.files:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            html = f.read()
+        scraper = LogisticsContractorScraper(args.url or path, extractor=extractor)
+        # Saved pages are parsed as they are; there is no browser to fall back to
+        record, reason = scraper.parse_static(html, rendered=True)
+        if record is None:
+            print(f"{path}: {reason}", file=sys.stderr)
+        else:
+            print(json.dumps(record))
+
+
+def command_export(args):
+    from record_sink import read_records, record_format
+
+    records = read_records(args.input)
+    if args.output.endswith('.parquet'):
+        from dealer_store import DealerStore
+        # Parquet is written from an in-memory dealer store, which merges duplicates
+        with DealerStore(':memory:') as store:
+            for record in records:
+                store.write(record)
+            store.flush()
+            store.export_parquet(args.output)
+    elif record_format(args.output) == 'sqlite':
+        from dealer_store import DealerStore
+        with DealerStore(args.output) as store:
+            for record in records:
+                store.write(record)
+    else:
+        from record_sink import RecordSink
+        with RecordSink(args.output, resume=False) as sink:
+            for record in records:
+                sink.write(record)
+    print(f"Exported {args.input} to {args.output}")
+
+
+def command_stats(args):
+    from insights import InsightAggregator, is_insights_file
+    from record_sink import read_records
+
+    if args.input.endswith('.json') and is_insights_file(args.input):
+        aggregator = InsightAggregator.load(args.input)
+    else:
+        aggregator = InsightAggregator().update(read_records(args.input))
+    if args.json:
+        print(json.dumps(aggregator.insights(args.top), indent=2))
+    else:
+        print(aggregator.summary(args.top))
+
+
+def command_reextract(args):
+    import time
+    from page_archive import reextract
+
+    extractor = None
+    if args.gazetteer:
+        from extraction import ContactExtractor
+        extractor = ContactExtractor.from_gazetteer(args.gazetteer)
+    started = time.perf_counter()
+    count = reextract(args.archive, args.output, workers=args.workers, extractor=extractor)
+    print(f"Re-extracted {count} records into {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+def command_coordinate(args):
+    import subprocess
+    from logistics_finder import LogisticsFinder
+    from work_queue import WorkQueue
+
+    with WorkQueue(args.queue) as queue:
+        # A queue file left by an earlier coordination starts over
+        queue.reset()
+    # Local workers start right away and take sites while discovery runs
+    workers = [
+        subprocess.Popen([sys.executable, __file__, 'work', '--queue', args.queue,
+                          '--worker-id', f'local-{i}', '--workers', str(args.workers)])
+        for i in range(args.local_workers)
+    ]
+    finder = LogisticsFinder(max_workers=args.workers, cache_path=args.cache, parse_workers=0)
+    finder.seed_files = args.seed_file
+    if args.no_search:
+        finder.search_queries = []
+    try:
+        with WorkQueue(args.queue) as queue:
+            finder.enqueue_companies(queue)
+    finally:
+        finder.close()
+
+    failed = sum(worker.wait() != 0 for worker in workers)
+    if failed:
+        print(f"{failed} local workers exited with an error")
+    if workers and args.output:
+        command_merge(args)
+
+
+def command_work(args):
+    from logistics_finder import LogisticsFinder
+    from work_queue import WorkQueue
+
+    cache = args.cache
+    if cache is None:
+        # A named worker keeps its own cache, so workers never wait on each other's writes
+        cache = f'page_cache.{args.worker_id}.sqlite3' if args.worker_id else 'page_cache.sqlite3'
+    finder = LogisticsFinder(max_workers=args.workers, cache_path=cache,
+                             parse_workers=args.parse_workers, archive_path=args.archive)
+    try:
+        with WorkQueue(args.queue) as queue:
+            written = finder.work_queue(queue, worker_id=args.worker_id)
+        print(f"Worker stored {written} records")
+    finally:
+        finder.close()
+
+
+def command_merge(args):
+    from dedup import merge_file, merge_records
+    from record_sink import RecordSink
+    from work_queue import WorkQueue
+
+    if getattr(args, 'input', None):
+        print(f"Merged {merge_file(args.input, args.output)} records into {args.output}")
+        return
+    with WorkQueue(args.queue) as queue:
+        # Records for the same dealer found by different workers are folded together
+        merged = merge_records(list(queue.records()))
+        print(f"Sites: {queue.counts()}")
+        insights = queue.insights()
+    with RecordSink(args.output, resume=False) as sink:
+        for record in merged:
+            sink.write(record)
+    print(f"Merged {len(merged)} records into {args.output}")
+    print(insights.summary())
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    discover = commands.add_parser('discover', help='list candidate company sites')
+    discover.add_argument('--seed-file', action='append', default=[],
+                          help='CSV of companies (quick_logistics_list.csv when no source is given)')
+    discover.add_argument('--url', action='append', default=[], help='known company URL')
+    discover.add_argument('--listing', action='append', default=[], help='directory page or sitemap linking to companies')
+    discover.add_argument('--query', action='append', default=[], help='Google search (starts a browser)')
+    discover.add_argument('--cache', default='page_cache.sqlite3', help='where search results are cached')
+    discover.add_argument('--output', help='write URLs here instead of stdout')
+    discover.set_defaults(func=command_discover)
+
+    crawl = commands.add_parser('crawl', help='discover and scrape companies')
+    crawl.add_argument('--output', default='all_logistics_companies.csv')
+    crawl.add_argument('--workers', type=int, default=4)
+    crawl.add_argument('--parse-workers', type=int, default=None, help='parser processes (default: one per worker, up to the CPUs), 0 to parse on the crawl threads')
+    crawl.add_argument('--seed-file', action='append', default=[])
+    crawl.add_argument('--no-search', action='store_true', help='skip the Google searches')
+    crawl.add_argument('--cache', default='page_cache.sqlite3')
+    crawl.add_argument('--frontier', default='crawl_frontier.sqlite3')
+    crawl.add_argument('--insights', default='crawl_insights.json')
+    crawl.add_argument('--fresh', action='store_true',
+                       help='start a new crawl even if the last one was interrupted')
+    crawl.add_argument('--merged', help='one record per dealer (default: <output>_merged.csv)')
+    crawl.add_argument('--no-merge', action='store_true', help='skip merging the output')
+    crawl.add_argument('--archive', default='pages.archive')
+    crawl.add_argument('--spans', default='crawl_spans.jsonl')
+    crawl.add_argument('--prometheus', default='crawl_metrics.prom')
+    crawl.set_defaults(func=command_crawl)
+
+    extract = commands.add_parser('extract', help='extract a record from saved HTML files')
+    extract.add_argument('files', nargs='+')
+    extract.add_argument('--url', help='URL the page was saved from')
+    extract.add_argument('--gazetteer', help='CSV of cities, states and districts to match')
+    extract.set_defaults(func=command_extract)
+
+    export = commands.add_parser('export', help='convert records between CSV, JSON Lines, SQLite and Parquet')
+    export.add_argument('input')
+    export.add_argument('output')
+    export.set_defaults(func=command_export)
+
+    stats = commands.add_parser('stats', help='summarise records or a saved insights file')
+    stats.add_argument('input')
+    stats.add_argument('--top', type=int, default=5)
+    stats.add_argument('--json', action='store_true')
+    stats.set_defaults(func=command_stats)
+
+    reextract = commands.add_parser('reextract', help='re-run extraction over a page archive')
+    reextract.add_argument('archive')
+    reextract.add_argument('output')
+    reextract.add_argument('--workers', type=int, default=None)
+    reextract.add_argument('--gazetteer')
+    reextract.set_defaults(func=command_reextract)
+
+    coordinate = commands.add_parser('coordinate', help='queue discovered companies for crawl workers')
+    coordinate.add_argument('--queue', default='work_queue.sqlite3', help='shared WorkQueue file')
+    coordinate.add_argument('--local-workers', type=int, default=0, help='worker processes to start on this host')
+    coordinate.add_argument('--workers', type=int, default=4, help='crawl threads per worker')
+    coordinate.add_argument('--seed-file', action='append', default=[])
+    coordinate.add_argument('--no-search', action='store_true', help='skip the Google searches')
+    coordinate.add_argument('--cache', default='page_cache.sqlite3')
+    coordinate.add_argument('--output', default='all_logistics_companies.csv',
+                            help='merged records, written once the local workers finish')
+    coordinate.set_defaults(func=command_coordinate)
+
+    work = commands.add_parser('work', help='crawl companies leased from a shared queue')
+    work.add_argument('--queue', default='work_queue.sqlite3')
+    work.add_argument('--worker-id', help='stable name of this worker (default: host and pid)')
+    work.add_argument('--workers', type=int, default=4, help='crawl threads')
+    work.add_argument('--parse-workers', type=int, default=None)
+    work.add_argument('--cache', help='page cache (default: page_cache.<worker-id>.sqlite3)')
+    work.add_argument('--archive', help='page archive of this worker; one per worker process')
+    work.set_defaults(func=command_work)
+
+    merge = commands.add_parser('merge', help='merge the records of every worker, or of a crawl output, into one file')
+    merge.add_argument('--queue', default='work_queue.sqlite3')
+    merge.add_argument('--input', help='crawl output to merge instead of the queue')
+    merge.add_argument('output')
+    merge.set_defaults(func=command_merge)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import sqlite3
+import threading
+import time
+
+from dedup import canonical_domain
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlFrontier:
+    def __init__(self, path='crawl_frontier.sqlite3', max_attempts=3):
+        """Persistent list of the sites of a crawl with their crawl status
+
+        Every item is pending, in_flight, done or failed, with an attempt
+        count and the last error. Each status change is one small commit in
+        WAL mode, so checkpoints cost next to nothing and a restarted crawl
+        picks up exactly the items that were not finished. Items left
+        in_flight by a crash go back to pending; failed items are retried
+        until they have been attempted max_attempts times. Sites are keyed
+        by canonical domain, so one site is never queued twice. begin_run
+        and finish_run mark the run boundary: once a run has finished, the
+        next one starts every item afresh. Search queries are not tracked;
+        the discovery cache keeps their results instead.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                item TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL,
+                UNIQUE (kind, key)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS frontier_status ON frontier (kind, status)')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+        # Whatever was running when the last process died starts over
+        self._conn.execute('UPDATE frontier SET status = ? WHERE status = ?', (PENDING, IN_FLIGHT))
+        self._conn.commit()
+
+    def begin_run(self, fresh=False):
+        """Start a run, returning whether it resumes one that was interrupted
+
+        When the last run finished, or with fresh, every item goes back to
+        pending with no attempts, so the sites are all crawled again.
+        """
+        with self._lock:
+            unfinished = self._conn.execute("SELECT 1 FROM meta WHERE name = 'run_started'").fetchone()
+            resuming = unfinished is not None and not fresh
+            if not resuming:
+                self._conn.execute(
+                    'UPDATE frontier SET status = ?, attempts = 0, last_error = NULL, updated_at = ?',
+                    (PENDING, time.time())
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (name, value) VALUES ('run_started', ?)", (str(time.time()),)
+                )
+            self._conn.commit()
+        return resuming
+
+    def finish_run(self):
+        """Mark the run complete, so the next begin_run starts a new one"""
+        with self._lock:
+            self._conn.execute("DELETE FROM meta WHERE name = 'run_started'")
+            self._conn.commit()
+
+    def key(self, kind, item):
+        return canonical_domain(item) if kind == 'site' else item
+
+    def add(self, kind, items):
+        """Queue items of a kind, such as 'site', ignoring ones already known"""
+        now = time.time()
+        rows = [(kind, self.key(kind, item), item, PENDING, now) for item in items if item]
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO frontier (kind, key, item, status, updated_at) VALUES (?, ?, ?, ?, ?)',
+                [row for row in rows if row[1]]
+            )
+            self._conn.commit()
+
+    def admit(self, kind, item):
+        """Queue item if it is new; return whether it still needs doing"""
+        self.add(kind, [item])
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, attempts FROM frontier WHERE kind = ? AND key = ?',
+                (kind, self.key(kind, item))
+            ).fetchone()
+        if row is None:
+            return False
+        status, attempts = row
+        return status == PENDING or (status == FAILED and attempts < self.max_attempts)
+
+    def pending(self, kind):
+        """Items still to do, in the order they were discovered"""
+        with self._lock:
+            rows = self._conn.execute(
+                '''SELECT item FROM frontier
+                   WHERE kind = ? AND (status = ? OR (status = ? AND attempts < ?))
+                   ORDER BY seq''',
+                (kind, PENDING, FAILED, self.max_attempts)
+            ).fetchall()
+        return [item for item, in rows]
+
+    def items(self, kind, status=None):
+        """Every item of a kind, optionally only those with a status"""
+        query = 'SELECT item FROM frontier WHERE kind = ?'
+        params = [kind]
+        if status is not None:
+            query += ' AND status = ?'
+            params.append(status)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY seq', params).fetchall()
+        return [item for item, in rows]
+
+    def _set(self, kind, item, status, error=None, attempt=False):
+        with self._lock:
+            self._conn.execute(
+                f'''UPDATE frontier SET status = ?, last_error = ?, updated_at = ?
+                    {', attempts = attempts + 1' if attempt else ''}
+                    WHERE kind = ? AND key = ?''',
+                (status, error, time.time(), kind, self.key(kind, item))
+            )
+            self._conn.commit()
+
+    def start(self, kind, item):
+        """Mark an item in flight and count the attempt"""
+        self._set(kind, item, IN_FLIGHT, attempt=True)
+
+    def done(self, kind, item):
+        self._set(kind, item, DONE)
+
+    def fail(self, kind, item, error):
+        self._set(kind, item, FAILED, error=str(error))
+
+    def counts(self):
+        """Number of items per (kind, status)"""
+        with self._lock:
+            rows = self._conn.execute('SELECT kind, status, COUNT(*) FROM frontier GROUP BY kind, status').fetchall()
+        return {(kind, status): count for kind, status, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,167 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CrawlMetrics:
+    def __init__(self, spans_path=None, profile_stages=(), profile_dir='profiles', enabled=True):
+        """Per-URL stage timings and crawl counters
+
+        Every span (driver setup, navigation, waits, extraction, parsing,
+        output...) is appended to spans_path as a JSON line when it ends
+        and folded into per-stage totals. Counters track pages, failures,
+        retries, fallbacks and the like. The totals can be written or
+        served in Prometheus text format. Stages named in profile_stages
+        run under cProfile and their stats are saved in profile_dir on
+        close; only one stage is profiled at a time.
+        """
+        self.enabled = enabled
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+        self.counters = defaultdict(int)
+        self.stages = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'max': 0.0, 'errors': 0})
+        self._profiles = {}
+        self._profiling = threading.Lock()
+        self._lock = threading.Lock()
+        self._spans = open(spans_path, 'a', encoding='utf-8') if spans_path and enabled else None
+        self._server = None
+
+    @contextmanager
+    def span(self, stage, url=None, **fields):
+        """Time the with block as one span of stage for url"""
+        if not self.enabled:
+            yield
+            return
+
+        profile = None
+        if stage in self.profile_stages and self._profiling.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is already running in this process
+                profile = None
+                self._profiling.release()
+
+        started = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                self._profiling.release()
+            self._record(stage, url, started, seconds, error, fields, profile)
+
+    def _record(self, stage, url, started, seconds, error, fields, profile):
+        span = {'ts': round(started, 3), 'stage': stage, 'url': url, 'seconds': round(seconds, 4),
+                'ok': error is None}
+        if error is not None:
+            span['error'] = f"{type(error).__name__}: {error}"
+        span.update(fields)
+        with self._lock:
+            totals = self.stages[stage]
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['max'] = max(totals['max'], seconds)
+            if error is not None:
+                totals['errors'] += 1
+            if profile is not None:
+                if stage in self._profiles:
+                    self._profiles[stage].add(profile)
+                else:
+                    self._profiles[stage] = pstats.Stats(profile)
+            if self._spans is not None:
+                self._spans.write(json.dumps(span) + '\n')
+                self._spans.flush()
+
+    def count(self, name, value=1):
+        """Add value to a counter such as 'pages', 'failures' or 'retries'"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self):
+        """Copy of the counters and per-stage totals"""
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'stages': {stage: dict(totals) for stage, totals in self.stages.items()}
+            }
+
+    def prometheus(self):
+        """Counters and stage totals in Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f'# TYPE crawl_{name}_total counter')
+            lines.append(f'crawl_{name}_total {value}')
+        if snapshot['stages']:
+            lines.append('# TYPE crawl_stage_seconds summary')
+            for stage, totals in sorted(snapshot['stages'].items()):
+                lines.append(f'crawl_stage_seconds_sum{{stage="{stage}"}} {totals["seconds"]:.6f}')
+                lines.append(f'crawl_stage_seconds_count{{stage="{stage}"}} {totals["count"]}')
+            lines.append('# TYPE crawl_stage_seconds_max gauge')
+            for stage, totals in sorted(snapshot['stages'].items()):
+                lines.append(f'crawl_stage_seconds_max{{stage="{stage}"}} {totals["max"]:.6f}')
+            lines.append('# TYPE crawl_stage_errors_total counter')
+            for stage, totals in sorted(snapshot['stages'].items()):
+                lines.append(f'crawl_stage_errors_total{{stage="{stage}"}} {totals["errors"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text to path, e.g. for node_exporter's textfile collector"""
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def serve(self, port=9108, host=''):
+        """Serve the Prometheus text at /metrics from a background thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200 if self.path.startswith('/metrics') else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_address[1]
+
+    def close(self):
+        """Save profiles, stop the endpoint and close the spans file"""
+        if self._profiles:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            for stage, stats in self._profiles.items():
+                stats.dump_stats(os.path.join(self.profile_dir, f'{stage}.prof'))
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._spans is not None:
+            self._spans.close()
+            self._spans = None
+
+
+# Used when no metrics are wanted; spans and counters cost nothing
+NULL_METRICS = CrawlMetrics(enabled=False)
@@ -0,0 +1,110 @@
+import queue
+import random
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+# How often an open feed is checked for new items while jobs run
+FEED_POLL = 0.2
+
+
+def domain_of(url):
+    """Host name used for politeness, without a leading www."""
+    netloc = urlparse(url).netloc.lower().split('@')[-1].split(':')[0]
+    return netloc[4:] if netloc.startswith('www.') else netloc
+
+
+class CrawlScheduler:
+    def __init__(self, max_workers=4, per_domain=1, delay=(5, 10)):
+        """Run crawl jobs on a thread pool with per-host politeness
+
+        At most max_workers jobs run at once and at most per_domain of them
+        against the same host. After a job for a host starts or finishes,
+        the next one for that host waits a random delay (min, max) seconds;
+        jobs for other hosts are dispatched meanwhile, so the delay costs
+        nothing when crawling many different domains.
+        """
+        self.max_workers = max_workers
+        self.per_domain = per_domain
+        self.delay = delay
+
+    def run(self, items, func, key=domain_of, delay=None):
+        """Call func(item) for every item, yielding (item, result, error) as jobs finish
+
+        items may also be a queue.Queue that other threads feed while the
+        jobs run, closed by putting None; items are scheduled as they arrive.
+        """
+        delay = self.delay if delay is None else delay
+        queues = defaultdict(deque)
+        feed = items if isinstance(items, queue.Queue) else None
+        if feed is None:
+            for item in items:
+                queues[key(item)].append(item)
+
+        def take(block_for=None):
+            """Move items waiting in the feed to the host queues"""
+            nonlocal feed
+            while feed is not None:
+                try:
+                    if block_for is None:
+                        item = feed.get_nowait()
+                    else:
+                        item = feed.get(timeout=block_for)
+                        block_for = None
+                except queue.Empty:
+                    return
+                if item is None:
+                    feed = None
+                else:
+                    queues[key(item)].append(item)
+
+        next_allowed = {}
+        active = defaultdict(int)
+        in_flight = {}
+
+        def pause():
+            return random.uniform(*delay) if delay else 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while queues or in_flight or feed is not None:
+                take()
+                now = time.monotonic()
+                wake = None
+
+                # Start every job whose host is free and past its delay
+                for domain in list(queues):
+                    if len(in_flight) >= self.max_workers:
+                        break
+                    if active[domain] >= self.per_domain:
+                        continue
+                    ready = next_allowed.get(domain, 0)
+                    if ready > now:
+                        wake = ready if wake is None else min(wake, ready)
+                        continue
+
+                    item = queues[domain].popleft()
+                    if not queues[domain]:
+                        del queues[domain]
+                    active[domain] += 1
+                    next_allowed[domain] = now + pause()
+                    in_flight[executor.submit(func, item)] = (item, domain)
+
+                if not in_flight:
+                    if feed is not None:
+                        # Wake on the next item or when a host becomes free
+                        take(FEED_POLL if wake is None else max(0, min(FEED_POLL, wake - time.monotonic())))
+                    elif wake is not None:
+                        time.sleep(max(0, wake - time.monotonic()))
+                    continue
+
+                timeout = None if wake is None else max(0, wake - time.monotonic())
+                if feed is not None:
+                    timeout = FEED_POLL if timeout is None else min(timeout, FEED_POLL)
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, domain = in_flight.pop(future)
+                    active[domain] -= 1
+                    next_allowed[domain] = max(next_allowed[domain], time.monotonic() + pause())
+                    error = future.exception()
+                    yield item, (None if error else future.result()), error
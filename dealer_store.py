@@ -0,0 +1,225 @@
+import json
+import sqlite3
+import threading
+import time
+
+from crawl_scheduler import domain_of
+
+# Scalar columns of the dealers table, in record field names
+DEALER_COLUMNS = ['name', 'website', 'address', 'pincode', 'city', 'state', 'district', 'country']
+
+# List fields, each kept in its own table of (website_key, value) rows
+LIST_TABLES = {
+    'emails': ('dealer_emails', 'email'),
+    'phone_numbers': ('dealer_phones', 'phone'),
+    'products': ('dealer_products', 'product'),
+    'sources': ('dealer_sources', 'source'),
+}
+
+# Fields of each entry of a merged dealer's branches, kept in dealer_branches
+BRANCH_FIELDS = ('address', 'pincode', 'city', 'state', 'district', 'website')
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS dealers (
+        website_key TEXT PRIMARY KEY,
+        domain TEXT,
+        name TEXT,
+        website TEXT,
+        address TEXT,
+        pincode TEXT,
+        city TEXT,
+        state TEXT,
+        district TEXT,
+        country TEXT,
+        updated_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS dealers_domain ON dealers (domain);
+    CREATE INDEX IF NOT EXISTS dealers_city ON dealers (city);
+    CREATE INDEX IF NOT EXISTS dealers_state ON dealers (state);
+    CREATE INDEX IF NOT EXISTS dealers_pincode ON dealers (pincode);
+    CREATE TABLE IF NOT EXISTS dealer_emails (
+        website_key TEXT, email TEXT, UNIQUE (website_key, email)
+    );
+    CREATE TABLE IF NOT EXISTS dealer_phones (
+        website_key TEXT, phone TEXT, UNIQUE (website_key, phone)
+    );
+    CREATE INDEX IF NOT EXISTS dealer_phones_phone ON dealer_phones (phone);
+    CREATE TABLE IF NOT EXISTS dealer_products (
+        website_key TEXT, product TEXT, UNIQUE (website_key, product)
+    );
+    CREATE TABLE IF NOT EXISTS dealer_sources (
+        website_key TEXT, source TEXT, UNIQUE (website_key, source)
+    );
+    CREATE TABLE IF NOT EXISTS dealer_branches (
+        website_key TEXT, address TEXT, pincode TEXT, city TEXT, state TEXT, district TEXT, website TEXT,
+        UNIQUE (website_key, address)
+    );
+    CREATE TABLE IF NOT EXISTS crawl_done (
+        url TEXT PRIMARY KEY
+    );
+'''
+
+
+def normalize_website(url):
+    """Key for a dealer's site: its lower-case host without www., so every page of it is one row"""
+    if not url:
+        return None
+    return domain_of(url if '//' in url else '//' + url)
+
+
+def as_list(value):
+    """List fields may arrive as lists or as ', '-joined strings from CSV"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(',') if v.strip()]
+    return list(value)
+
+
+class DealerStore:
+    def __init__(self, path='dealers.sqlite3', batch_size=500):
+        """SQLite store of dealer records with indexed lookups
+
+        Records are upserted by the site's domain, so the pages of one
+        dealer fold into one row: scalar fields take the newest non-empty
+        value, list fields gain any new entries and each page's address is
+        kept as a branch. Domain, city, state, pincode and phone are indexed. It
+        offers the same write/mark_done/is_done/close calls as RecordSink, so
+        it can be handed to LogisticsFinder.stream_companies in place of a
+        file sink.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.count = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def upsert(self, records):
+        """Insert or merge many records in one transaction"""
+        now = time.time()
+        with self._lock, self._conn:
+            for record in records:
+                key = normalize_website(record.get('website'))
+                if key is None:
+                    continue
+                values = [record.get(column) or None for column in DEALER_COLUMNS]
+                self._conn.execute(
+                    f'''INSERT INTO dealers (website_key, domain, {', '.join(DEALER_COLUMNS)}, updated_at)
+                        VALUES (?, ?, {', '.join('?' for _ in DEALER_COLUMNS)}, ?)
+                        ON CONFLICT (website_key) DO UPDATE SET
+                        {', '.join(f'{c} = COALESCE(excluded.{c}, {c})' for c in DEALER_COLUMNS)},
+                        updated_at = excluded.updated_at''',
+                    [key, key] + values + [now]
+                )
+                for field, (table, column) in LIST_TABLES.items():
+                    self._conn.executemany(
+                        f'INSERT OR IGNORE INTO {table} (website_key, {column}) VALUES (?, ?)',
+                        [(key, str(value)) for value in as_list(record.get(field))]
+                    )
+                self._conn.executemany(
+                    f'''INSERT OR IGNORE INTO dealer_branches (website_key, {', '.join(BRANCH_FIELDS)})
+                        VALUES (?, {', '.join('?' for _ in BRANCH_FIELDS)})''',
+                    [[key] + [branch.get(field) for field in BRANCH_FIELDS]
+                     for branch in (record.get('branches') or []) + [record] if branch.get('address')]
+                )
+
+    def write(self, record):
+        """Queue one record, upserting a batch at a time"""
+        self._pending.append(record)
+        self.count += 1
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Upsert every queued record"""
+        pending, self._pending = self._pending, []
+        if pending:
+            self.upsert(pending)
+
+    def mark_done(self, url):
+        """Record that every record for url has been stored"""
+        self.flush()
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR IGNORE INTO crawl_done (url) VALUES (?)', (url,))
+
+    def is_done(self, url):
+        """Whether url was completed by this or an earlier run"""
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM crawl_done WHERE url = ?', (url,)).fetchone() is not None
+
+    def query(self, where='1', params=(), batch=1000):
+        """Yield records matching a SQL condition on the dealers table, lists included
+
+        For example query('city = ?', ['Mumbai']) or, for a phone number,
+        query('website_key IN (SELECT website_key FROM dealer_phones WHERE phone = ?)', [phone]).
+        """
+        lists = ', '.join(
+            f'(SELECT json_group_array({column}) FROM {table} t WHERE t.website_key = d.website_key)'
+            for table, column in LIST_TABLES.values()
+        )
+        branch = ', '.join(f"'{field}', b.{field}" for field in BRANCH_FIELDS)
+        lists += (f', (SELECT json_group_array(json_object({branch})) FROM dealer_branches b'
+                  f' WHERE b.website_key = d.website_key)')
+        with self._lock:
+            cursor = self._conn.execute(
+                f'SELECT {", ".join(DEALER_COLUMNS)}, {lists} FROM dealers d WHERE {where} ORDER BY website_key',
+                params
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch)
+            if not rows:
+                return
+            for row in rows:
+                record = dict(zip(DEALER_COLUMNS, row))
+                for field, value in zip(LIST_TABLES, row[len(DEALER_COLUMNS):]):
+                    record[field] = json.loads(value)
+                branches = json.loads(row[-1])
+                # A single address is the dealer's own, not a branch network
+                record['branches'] = [
+                    {field: value for field, value in branch.items() if value is not None}
+                    for branch in branches
+                ] if len(branches) > 1 else []
+                yield record
+
+    def export_parquet(self, path, batch=10000):
+        """Write every dealer to a Parquet file with real list columns
+
+        Needs pyarrow; rows are written a batch at a time.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+        self.flush()
+        schema = pa.schema(
+            [(column, pa.string()) for column in DEALER_COLUMNS]
+            + [(field, pa.list_(pa.string())) for field in LIST_TABLES]
+            + [('branches', pa.list_(pa.struct([(field, pa.string()) for field in BRANCH_FIELDS])))]
+        )
+        with pq.ParquetWriter(path, schema) as writer:
+            rows = []
+            for record in self.query(batch=batch):
+                rows.append(record)
+                if len(rows) >= batch:
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                    rows = []
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+
+    def close(self):
+        """Store anything queued and close the database"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,145 @@
+import re
+from collections import defaultdict
+
+from crawl_scheduler import domain_of
+from dealer_store import BRANCH_FIELDS, as_list
+
+NON_DIGIT_RE = re.compile(r'\D')
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+# Mail providers shared by unrelated businesses, so their domain says nothing
+FREE_MAIL_DOMAINS = {
+    'gmail.com', 'yahoo.com', 'yahoo.co.in', 'hotmail.com', 'outlook.com',
+    'rediffmail.com', 'live.com', 'icloud.com', 'aol.com', 'protonmail.com'
+}
+
+LIST_FIELDS = ('emails', 'phone_numbers', 'products')
+
+# Keys unrelated dealers can share, so ones seen too often are ignored
+SHARED_KEY_KINDS = ('phone', 'email_domain')
+
+
+def canonical_domain(url):
+    """Host of a URL, lower-cased and without www., e.g. dhl.com"""
+    return domain_of(url if '//' in url else '//' + url)
+
+
+def normalize_phone(phone):
+    """Last ten digits, so +91 98..., 098... and 98... agree"""
+    digits = NON_DIGIT_RE.sub('', str(phone))
+    return digits[-10:] if len(digits) >= 8 else None
+
+
+def record_keys(record):
+    """Identifying keys of a record, each a (kind, value) tuple"""
+    keys = set()
+    for phone in as_list(record.get('phone_numbers')):
+        phone = normalize_phone(phone)
+        if phone:
+            keys.add(('phone', phone))
+    for email in as_list(record.get('emails')):
+        domain = email.rsplit('@', 1)[-1].lower()
+        if '@' in email and domain not in FREE_MAIL_DOMAINS:
+            keys.add(('email_domain', domain))
+    if record.get('website'):
+        keys.add(('site', canonical_domain(record['website'])))
+    # A pincode covers a whole area, so on its own it would merge every
+    # dealer there; it only identifies a dealer together with the address
+    address = NON_WORD_RE.sub(' ', str(record.get('address') or '').lower()).strip()
+    if record.get('pincode') and address:
+        keys.add(('address_pincode', f"{address}|{record['pincode']}"))
+    return keys
+
+
+def merge_group(records):
+    """Fold records of one dealer into a single entity
+
+    Scalar fields keep the first non-empty value, list fields are unioned
+    in order and every source website is kept under 'sources'. When the
+    records hold different addresses (a carrier's branch pages) each one
+    is kept under 'branches'.
+    """
+    merged = {}
+    lists = {field: {} for field in LIST_FIELDS}
+    sources = {}
+    branches = {}
+    for record in records:
+        if record.get('address'):
+            branch = {field: record[field] for field in BRANCH_FIELDS if record.get(field)}
+            key = NON_WORD_RE.sub(' ', str(record['address']).lower()).strip()
+            branches.setdefault(key, branch)
+        for key, value in record.items():
+            if key in lists:
+                for item in as_list(value):
+                    same = normalize_phone(item) if key == 'phone_numbers' else None
+                    lists[key].setdefault(same or str(item).lower(), item)
+            elif value and not merged.get(key):
+                merged[key] = value
+        if record.get('website'):
+            sources[record['website']] = True
+    for field, items in lists.items():
+        if items:
+            merged[field] = list(items.values())
+    if sources:
+        merged['sources'] = list(sources)
+    if len(branches) > 1:
+        merged['branches'] = list(branches.values())
+    return merged
+
+
+def merge_records(records, max_key_size=50):
+    """Cluster records that share a phone, email domain, site or address+pincode
+
+    Records are linked through hash indexes on their keys with a
+    union-find, so the work grows with the number of keys rather than the
+    number of pairs. A phone or email domain shared by more than
+    max_key_size records (a call-centre number, a directory's email
+    domain) is ignored as not identifying anyone; a site is never capped,
+    since a carrier's hundreds of branch pages are still one dealer. Returns one merged record per cluster, in order of
+    first appearance.
+    """
+    records = list(records)
+    parent = list(range(len(records)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = defaultdict(list)
+    for i, record in enumerate(records):
+        for key in record_keys(record):
+            index[key].append(i)
+
+    for (kind, _), members in index.items():
+        if len(members) < 2 or (kind in SHARED_KEY_KINDS and len(members) > max_key_size):
+            continue
+        root = find(members[0])
+        for i in members[1:]:
+            other = find(i)
+            if other != root:
+                # Keep the earliest record as root so output order is stable
+                if other < root:
+                    root, other = other, root
+                parent[other] = root
+
+    clusters = defaultdict(list)
+    for i, record in enumerate(records):
+        clusters[find(i)].append(record)
+    return [merge_group(clusters[root]) for root in sorted(clusters)]
+
+
+def merge_file(in_path, out_path):
+    """Merge the records of a crawl output (CSV, JSON Lines or DealerStore) into out_path
+
+    Streamed crawls write one record per page as it is found; this folds
+    the whole file into one record per dealer. Returns how many were written.
+    """
+    from record_sink import RecordSink, read_records
+
+    merged = merge_records(read_records(in_path))
+    with RecordSink(out_path, resume=False) as sink:
+        for record in merged:
+            sink.write(record)
+    return len(merged)
@@ -0,0 +1,233 @@
+import csv
+import queue
+import random
+import threading
+import time
+from urllib.parse import quote_plus, urljoin
+
+from crawl_metrics import NULL_METRICS
+from dedup import canonical_domain
+
+# Hosts that show up in listings and search results but are never dealers
+SKIP_HOSTS = {
+    'google', 'youtube', 'facebook', 'linkedin', 'twitter', 'instagram', 'wikipedia', 'x'
+}
+
+
+def is_candidate(url):
+    """Whether url may be a dealer's site rather than a social or search page"""
+    if not url or not url.startswith('http'):
+        return False
+    host = canonical_domain(url)
+    return bool(host) and not SKIP_HOSTS & set(host.split('.'))
+
+
+class DiscoverySource:
+    """Somewhere candidate dealer sites come from
+
+    A source answers queries (a seed file, a listing page, a search phrase)
+    with candidate URLs. Subclasses set name and implement queries() and
+    search(query). With a cache, results younger than ttl seconds are
+    reused instead of searching again; cacheable = False skips the cache
+    for sources that are cheap to read.
+    """
+    name = 'source'
+    ttl = 7 * 24 * 3600
+    cacheable = True
+
+    def queries(self):
+        return []
+
+    def search(self, query):
+        raise NotImplementedError
+
+    def results(self, cache=None):
+        """Yield (query, urls) for every query, from the cache when fresh
+
+        A failing query, or one that found nothing (a search answered with a
+        CAPTCHA), is left out of the cache, so the next run tries it again.
+        """
+        for query in self.queries():
+            urls = None
+            if cache is not None and self.cacheable:
+                urls = cache.discovered(self.name, query, self.ttl)
+            if urls is None:
+                try:
+                    urls = [url for url in self.search(query) if is_candidate(url)]
+                except Exception as e:
+                    print(f"Error in {self.name} discovery for {query}: {str(e)}")
+                    continue
+                if cache is not None and self.cacheable and urls:
+                    cache.store_discovered(self.name, query, urls)
+            yield query, urls
+
+
+class SeedListSource(DiscoverySource):
+    name = 'seed'
+    cacheable = False
+
+    def __init__(self, urls):
+        """Fixed list of known company URLs"""
+        self.urls = list(urls)
+
+    def queries(self):
+        return ['seed list'] if self.urls else []
+
+    def search(self, query):
+        return self.urls
+
+
+class SeedFileSource(DiscoverySource):
+    name = 'seed_file'
+    cacheable = False
+
+    def __init__(self, path, column='Website'):
+        """CSV of companies such as quick_logistics_list.csv, reading URLs from column
+
+        Files without that column are read as one URL per line.
+        """
+        self.path = path
+        self.column = column
+
+    def queries(self):
+        return [self.path]
+
+    def search(self, query):
+        with open(query, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames and self.column in reader.fieldnames:
+                return [row[self.column].strip() for row in reader if row.get(self.column)]
+            f.seek(0)
+            return [line.strip() for line in f if line.strip()]
+
+
+class ListingPageSource(DiscoverySource):
+    name = 'listing'
+    ttl = 24 * 3600
+
+    def __init__(self, pages, client=None, timeout=15):
+        """Directory pages and sitemaps that link out to dealer sites
+
+        Links from an HTML page to other hosts are the candidates; a sitemap
+        contributes every URL it lists.
+        """
+        self.pages = list(pages)
+        self.client = client
+        self.timeout = timeout
+
+    def queries(self):
+        return self.pages
+
+    def search(self, query):
+        from bs4 import BeautifulSoup
+        from http_client import shared_client
+        from site_crawler import SITEMAP_LOC_RE
+
+        response = (self.client or shared_client()).get(query, timeout=self.timeout)
+        response.raise_for_status()
+        if '<urlset' in response.text[:2048] or '<sitemapindex' in response.text[:2048]:
+            return SITEMAP_LOC_RE.findall(response.text)
+
+        listing_host = canonical_domain(response.url)
+        soup = BeautifulSoup(response.text, 'html.parser')
+        urls = []
+        for anchor in soup.find_all('a', href=True):
+            url = urljoin(response.url, anchor['href'])
+            if canonical_domain(url) != listing_host:
+                urls.append(url)
+        return urls
+
+
+class SearchSource(DiscoverySource):
+    name = 'search'
+
+    def __init__(self, queries, pool, delay=(10, 15), metrics=None):
+        """Google results rendered in a browser from pool
+
+        Live searches are spaced delay (min, max) seconds apart to be nice
+        to Google; answers from the cache cost no wait at all.
+        """
+        self.search_queries = list(queries)
+        self.pool = pool
+        self.delay = delay
+        self.metrics = metrics or NULL_METRICS
+        self._last_search = None
+
+    def queries(self):
+        return self.search_queries
+
+    def search(self, query):
+        from selenium.webdriver.common.by import By
+
+        if self._last_search is not None and self.delay:
+            time.sleep(max(0, self._last_search + random.uniform(*self.delay) - time.monotonic()))
+        search_url = f"https://www.google.com/search?q={quote_plus(query)}"
+        try:
+            with self.metrics.span('search', search_url), self.pool.driver() as driver:
+                driver.get(search_url)
+                time.sleep(random.uniform(2, 4))
+
+                # Extract all result links
+                urls = []
+                for link in driver.find_elements(By.CSS_SELECTOR, 'div.g a'):
+                    try:
+                        urls.append(link.get_attribute('href'))
+                    except Exception:
+                        continue
+                return urls
+        finally:
+            self._last_search = time.monotonic()
+
+
+def stream_sources(sources, cache=None, accept=None, initial=()):
+    """Run every source on its own thread, feeding candidate URLs into a queue
+
+    Returns a queue.Queue that receives one URL per site as soon as any
+    source finds it, then None once every source is finished; it can be
+    handed straight to CrawlScheduler.run. URLs in initial go first.
+    accept(url), when given, decides whether a new site is queued.
+    """
+    feed = queue.Queue()
+    seen = set()
+    lock = threading.Lock()
+
+    def offer(urls):
+        for url in urls:
+            key = canonical_domain(url)
+            with lock:
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+            if accept is None or accept(url):
+                feed.put(url)
+
+    def run(source):
+        try:
+            for query, urls in source.results(cache):
+                print(f"Discovered {len(urls)} URLs from {source.name}: {query}")
+                offer(urls)
+        except Exception as e:
+            print(f"Error in {source.name} discovery: {str(e)}")
+
+    offer(initial)
+    threads = [threading.Thread(target=run, args=(source,), daemon=True) for source in sources]
+    for thread in threads:
+        thread.start()
+
+    def close():
+        for thread in threads:
+            thread.join()
+        feed.put(None)
+
+    threading.Thread(target=close, daemon=True).start()
+    return feed
+
+
+def drain(feed):
+    """Every URL from a stream_sources queue, as a list"""
+    urls = []
+    while True:
+        url = feed.get()
+        if url is None:
+            return urls
+        urls.append(url)
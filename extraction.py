@@ -0,0 +1,237 @@
+import csv
+import re
+
+EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+
+PHONE_PATTERNS = [
+    r'(?:\+91|0)?[-\s]?\d{10}',  # Indian mobile
+    r'\d{3}[-.\s]?\d{3}[-.\s]?\d{4}',  # XXX-XXX-XXXX
+    r'\d{4}[-.\s]?\d{3}[-.\s]?\d{3}',  # XXXX-XXX-XXX
+    r'\+\d{1,3}[-.\s]?\d{3}[-.\s]?\d{3}[-.\s]?\d{4}'  # International
+]
+
+# Common Indian cities and states
+DEFAULT_CITIES = ['Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Kolkata',
+                  'Pune', 'Ahmedabad', 'Surat', 'Jaipur', 'Lucknow', 'Kanpur']
+
+DEFAULT_STATES = ['Maharashtra', 'Delhi', 'Karnataka', 'Telangana', 'Tamil Nadu',
+                  'West Bengal', 'Gujarat', 'Rajasthan', 'Uttar Pradesh', 'Kerala']
+
+ADDRESS_RE = re.compile(r'(?i)(?:address|location)[:\s]*(.*?)(?:\n|$)')
+ADDRESS_PREFIX_RE = re.compile(r'^.*?(?:Address|Add|Location)[:\s]*', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+NON_DIGIT_RE = re.compile(r'\D')
+WORD_START_RE = re.compile(r'\b\w')
+
+# Runs of tags and whitespace collapse to a single space, which is what
+# replacing tags with spaces and then squeezing whitespace produced
+TAGS_AND_SPACE_RE = re.compile(r'(?:<[^>]+>|\s)+')
+
+
+def clean_html(text):
+    """Clean HTML tags from text"""
+    clean = TAGS_AND_SPACE_RE.sub(' ', text)
+    # Clean up special characters
+    clean = clean.replace('&nbsp;', ' ').replace('&amp;', '&').replace('&quot;', '"')
+    return clean.strip()
+
+
+def clean_address(address):
+    """Strip the leading 'Address:' style label and squeeze whitespace"""
+    address = ADDRESS_PREFIX_RE.sub('', address)
+    return WHITESPACE_RE.sub(' ', address).strip()
+
+
+def trie_pattern(words):
+    """Build a regex alternation shaped like a trie of lower-cased words
+
+    Shared prefixes are matched once, so the pattern stays fast with
+    thousands of names instead of trying each name in turn.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word.lower():
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+
+def load_gazetteer(path):
+    """Read place names from a CSV with 'name' and 'kind' columns
+
+    kind is 'city', 'state' or 'district'; earlier rows win when a text
+    mentions several places of the same kind.
+    """
+    places = {'city': [], 'state': [], 'district': []}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            name = (row.get('name') or '').strip()
+            kind = (row.get('kind') or '').strip().lower()
+            if name and kind in places:
+                places[kind].append(name)
+    return places
+
+
+class ContactExtractor:
+    def __init__(self, cities=DEFAULT_CITIES, states=DEFAULT_STATES, districts=()):
+        """Precompiled extractor for emails, phones, pincodes and places
+
+        Emails, pincodes and gazetteer names are found in a single scan of
+        the text; the place names are compiled into one trie-shaped pattern
+        so adding thousands of names does not add a pass per name. The four
+        phone patterns keep their own precompiled scans because folding
+        them into one alternation would drop overlapping matches.
+        """
+        self.places = {}
+        self._variants = {}
+        for kind, names in (('city', cities), ('state', states), ('district', districts)):
+            for rank, name in enumerate(names):
+                self.places.setdefault(name.lower(), {}).setdefault(kind, (rank, name))
+
+        places_pattern = trie_pattern(self.places) if self.places else None
+        # Pincodes and places are captured by lookaheads, so one that
+        # overlaps an email (or another place) is still seen; the scan
+        # itself only consumes an email or one run of letters and digits
+        lookaheads = r'(?:(?=\b(?P<pincode>\d{6})\b))?'
+        if places_pattern:
+            lookaheads += rf'(?:(?=\b(?P<place>{places_pattern})\b))?'
+        # Emails and the runs stepped over keep case-sensitive ASCII classes:
+        # under IGNORECASE [a-z] also takes Unicode letters such as 'İ' or
+        # 'ſ', which would widen an email or skip over the start of one
+        self.entity_re = re.compile(
+            lookaheads + rf'(?:(?P<email>(?-i:{EMAIL_PATTERN}))|(?-i:[a-zA-Z0-9]+)|.)',
+            re.IGNORECASE | re.DOTALL
+        )
+        # Words inside an email are checked on their own, since the main
+        # scan steps over the whole address at once
+        inner = r'(?P<pincode>\d{6})'
+        if places_pattern:
+            inner += rf'|(?P<place>{places_pattern})'
+        self.inner_re = re.compile(rf'\b(?:{inner})\b', re.IGNORECASE)
+        self.phone_res = [re.compile(pattern) for pattern in PHONE_PATTERNS]
+
+    @classmethod
+    def from_gazetteer(cls, path):
+        """Build an extractor from a gazetteer CSV (see load_gazetteer)"""
+        places = load_gazetteer(path)
+        return cls(places['city'], places['state'], places['district'])
+
+    def extract_emails(self, text):
+        """Extract email addresses"""
+        return self.scan(text)[0]
+
+    def extract_phone_numbers(self, text):
+        """Extract phone numbers"""
+        phones = set()
+        for pattern in self.phone_res:
+            phones.update(pattern.findall(text))
+
+        # Clean up phone numbers
+        cleaned_phones = set()
+        for phone in phones:
+            # Remove all non-digit characters
+            digits = NON_DIGIT_RE.sub('', phone)
+            # Add back the plus sign for international numbers
+            if len(digits) > 10:
+                cleaned_phones.add('+' + digits)
+            else:
+                cleaned_phones.add(digits)
+
+        return list(cleaned_phones)
+
+    def extract_location_details(self, text):
+        """Extract location details"""
+        return self.location_details(text, *self.scan(text)[1:])
+
+    def place_key(self, place):
+        """Key in self.places of a place name as it matched in the text
+
+        Case-insensitive matching also accepts Unicode variants such as 'İ'
+        for 'i' or 'ſ' for 's', whose lower() is not a key; those are
+        resolved against the names once and remembered.
+        """
+        key = place.lower()
+        if key in self.places:
+            return key
+        if place not in self._variants:
+            self._variants[place] = next(
+                name for name in self.places
+                if len(name) == len(place) and re.fullmatch(re.escape(name), place, re.IGNORECASE)
+            )
+        return self._variants[place]
+
+    def scan(self, text):
+        """Single pass over the text for emails, the first pincode and places
+
+        Returns (emails, pincode, places) where places maps each kind to
+        the earliest-listed name of that kind found in the text.
+        """
+        emails = {}
+        pincode = None
+        best = {}
+
+        def add_place(place):
+            for kind, (rank, name) in self.places[self.place_key(place)].items():
+                if kind not in best or rank < best[kind][0]:
+                    best[kind] = (rank, name)
+
+        def add(match):
+            nonlocal pincode
+            if pincode is None and match.group('pincode'):
+                pincode = match.group('pincode')
+            place = match.group('place') if self.places else None
+            if place:
+                add_place(place)
+
+        for match in self.entity_re.finditer(text):
+            add(match)
+            if match.group('email'):
+                emails[match.group('email')] = True
+                for word in WORD_START_RE.finditer(text, match.start() + 1, match.end()):
+                    inner = self.inner_re.match(text, word.start())
+                    if inner:
+                        add(inner)
+
+        return list(emails), pincode, {kind: name for kind, (rank, name) in best.items()}
+
+    def location_details(self, text, pincode, places):
+        """Assemble the location record from a scan's pincode and places"""
+        location_info = {}
+        # Extract address first
+        address_match = ADDRESS_RE.search(text)
+        if address_match:
+            location_info['address'] = address_match.group(1).strip()
+        if pincode:
+            location_info['pincode'] = pincode
+        for kind in ('city', 'state', 'district'):
+            if kind in places:
+                location_info[kind] = places[kind]
+        location_info['country'] = 'India'
+        return location_info
+
+    def extract(self, text):
+        """Find every entity type in the text
+
+        Returns a dict with 'emails', 'phone_numbers' and 'location', the
+        last holding address, pincode, city, state, district and country.
+        """
+        emails, pincode, places = self.scan(text)
+        return {
+            'emails': emails,
+            'phone_numbers': self.extract_phone_numbers(text),
+            'location': self.location_details(text, pincode, places)
+        }
+
+
+DEFAULT_EXTRACTOR = ContactExtractor()
@@ -0,0 +1,161 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from browser_pool import USER_AGENT
+from crawl_scheduler import domain_of
+
+try:
+    import brotli  # noqa: F401  (lets urllib3 decode br responses)
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_dns_lock = threading.Lock()
+_dns_cache = OrderedDict()
+_dns_cache_ttl = None
+_dns_cache_size = 1024
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        hit = _dns_cache.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                _dns_cache.move_to_end(key)
+                return hit[1]
+            del _dns_cache[key]
+    result = _original_getaddrinfo(host, port, *args, **kwargs)
+    with _dns_lock:
+        _dns_cache[key] = (now + _dns_cache_ttl, result)
+        while len(_dns_cache) > _dns_cache_size:
+            # Least recently used first; expired ones go the same way
+            _dns_cache.popitem(last=False)
+    return result
+
+
+def install_dns_cache(ttl=300, max_entries=1024):
+    """Cache name lookups for ttl seconds process-wide
+
+    urllib3 resolves the host for every new connection; with many short
+    connections to the same hosts the lookups add up. At most max_entries
+    lookups are kept, least recently used evicted first. When several
+    clients ask for a cache the shortest ttl and smallest size win, so no
+    client gets answers older than it allows.
+    """
+    global _dns_cache_ttl, _dns_cache_size
+    with _dns_lock:
+        if _dns_cache_ttl is None:
+            _dns_cache_ttl, _dns_cache_size = ttl, max_entries
+        else:
+            _dns_cache_ttl = min(_dns_cache_ttl, ttl)
+            _dns_cache_size = min(_dns_cache_size, max_entries)
+        socket.getaddrinfo = _cached_getaddrinfo
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        """Allow rate requests per second on average, up to burst at once"""
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    def __init__(self, pool_connections=32, pool_size=8, retries=3, backoff=0.5,
+                 rate=2.0, burst=4, user_agent=USER_AGENT, dns_cache_ttl=300):
+        """Thread-safe HTTP client shared by every static fetch
+
+        One requests session keeps keep-alive pools for up to
+        pool_connections hosts with pool_size connections each. GET and HEAD
+        requests answered with 429 or 5xx are retried up to retries times
+        with exponential backoff, honouring Retry-After. Each host gets a
+        token bucket of rate requests per second (burst at once). gzip and
+        deflate are decoded, and br too when the brotli package is
+        installed. With dns_cache_ttl, name lookups are cached at most that
+        long (see install_dns_cache).
+        """
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=('GET', 'HEAD'),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept-Encoding': ACCEPT_ENCODING
+        })
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        if dns_cache_ttl:
+            install_dns_cache(dns_cache_ttl)
+
+    def bucket(self, url):
+        """Token bucket for the host of url"""
+        domain = domain_of(url)
+        with self._lock:
+            if domain not in self._buckets:
+                self._buckets[domain] = TokenBucket(self.rate, self.burst)
+            return self._buckets[domain]
+
+    def get(self, url, headers=None, timeout=15, **kwargs):
+        """GET url through the shared pools, waiting for the host's rate limit"""
+        if self.rate:
+            self.bucket(url).acquire()
+        return self.session.get(url, headers=headers, timeout=timeout, **kwargs)
+
+    def close(self):
+        """Close every pooled connection"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_client():
+    """Process-wide HttpClient for callers that are not given one"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpClient()
+        return _shared
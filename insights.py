@@ -0,0 +1,259 @@
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+
+from dealer_store import as_list
+from dedup import canonical_domain, normalize_phone
+
+
+def hash64(value):
+    """Stable 64-bit hash of a string, the same in every process"""
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def is_insights_file(path):
+    """Whether a .json file holds a saved InsightAggregator rather than JSON Lines records
+
+    save() pretty-prints, so the first line is a lone '{', which a line of
+    JSON Lines never is.
+    """
+    with open(path, encoding='utf-8') as f:
+        return f.readline().strip() == '{'
+
+
+class TopK:
+    def __init__(self, capacity=1000):
+        """Space-saving counter that tracks the most frequent values in fixed memory
+
+        Counts are exact while fewer than capacity distinct values have been
+        seen. Beyond that the least frequent value is evicted and its count
+        inherited by the newcomer, so counts may be overestimated by at most
+        the evicted count, but the true top values are kept. The least
+        frequent value is found on a min-heap of (count, value) entries;
+        entries outdated by a later count are skipped when popped, and the
+        heap is rebuilt once they outnumber the live ones.
+        """
+        self.capacity = capacity
+        self.counts = {}
+        self._heap = None
+        self._seq = itertools.count()
+
+    def _rebuild(self):
+        self._heap = [(count, next(self._seq), value) for value, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_smallest(self):
+        if self._heap is None or len(self._heap) > 2 * len(self.counts) + 16:
+            self._rebuild()
+        while True:
+            count, _, value = heapq.heappop(self._heap)
+            if self.counts.get(value) == count:
+                return value
+
+    def add(self, value, count=1):
+        if value in self.counts:
+            self.counts[value] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = count
+        else:
+            smallest = self._pop_smallest()
+            self.counts[value] = self.counts.pop(smallest) + count
+        if self._heap is not None:
+            heapq.heappush(self._heap, (self.counts[value], next(self._seq), value))
+
+    def merge(self, other):
+        """Fold in another TopK, keeping the capacity largest totals"""
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if len(self.counts) > self.capacity:
+            keep = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+            self.counts = dict(keep)
+        self._heap = None
+
+    def most_common(self, n=None):
+        """[(value, count)] from most to least frequent"""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return ranked if n is None else ranked[:n]
+
+
+class DistinctCounter:
+    def __init__(self, precision=12):
+        """HyperLogLog estimate of the number of distinct values
+
+        Uses 2**precision one-byte registers (4 KiB by default) with a
+        standard error of about 1.04 / sqrt(2**precision), 1.6% by default.
+        Counters of equal precision merge by taking the register maxima.
+        """
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        h = hash64(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge distinct counters of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small sets
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class InsightAggregator:
+    def __init__(self, top_k=1000, precision=12):
+        """Running statistics over scraped records, updated one record at a time
+
+        Tracks contact coverage, city, state and pincode distributions, top
+        products and distinct sites, emails and phones without keeping any
+        record. Distributions are TopK counters of top_k values and distinct
+        counts are HyperLogLog estimates, so memory stays fixed however
+        large the crawl. Aggregators from other threads or processes fold in
+        with merge, or travel as JSON through to_dict and from_dict.
+        """
+        self.top_k = top_k
+        self.precision = precision
+        self.total = 0
+        self.coverage = {'with_email': 0, 'with_phone': 0, 'with_website': 0, 'with_address': 0}
+        self.cities = TopK(top_k)
+        self.states = TopK(top_k)
+        self.pincodes = TopK(top_k)
+        self.products = TopK(top_k)
+        self.distinct = {name: DistinctCounter(precision) for name in ('websites', 'emails', 'phones')}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        """Count one record"""
+        emails = as_list(record.get('emails'))
+        phones = as_list(record.get('phone_numbers'))
+        with self._lock:
+            self.total += 1
+            self.coverage['with_email'] += bool(emails)
+            self.coverage['with_phone'] += bool(phones)
+            self.coverage['with_website'] += bool(record.get('website'))
+            self.coverage['with_address'] += bool(record.get('address'))
+            for field, counter in (('city', self.cities), ('state', self.states), ('pincode', self.pincodes)):
+                if record.get(field):
+                    counter.add(str(record[field]))
+            for product in as_list(record.get('products')):
+                self.products.add(product)
+            if record.get('website'):
+                self.distinct['websites'].add(canonical_domain(record['website']))
+            for email in emails:
+                self.distinct['emails'].add(email.lower())
+            for phone in phones:
+                digits = normalize_phone(phone)
+                if digits:
+                    self.distinct['phones'].add(digits)
+
+    def update(self, records):
+        """Count every record of an iterable; returns self"""
+        for record in records:
+            self.add(record)
+        return self
+
+    def merge(self, other):
+        """Fold in the counts of another aggregator; returns self"""
+        with self._lock:
+            self.total += other.total
+            for key, count in other.coverage.items():
+                self.coverage[key] = self.coverage.get(key, 0) + count
+            self.cities.merge(other.cities)
+            self.states.merge(other.states)
+            self.pincodes.merge(other.pincodes)
+            self.products.merge(other.products)
+            for name, counter in self.distinct.items():
+                counter.merge(other.distinct[name])
+        return self
+
+    def insights(self, n=None):
+        """Current statistics, in the shape LogisticsContractorScraper.generate_insights returns
+
+        n limits each distribution to its n most frequent values.
+        """
+        with self._lock:
+            return {
+                'total_contractors': self.total,
+                'contact_stats': dict(self.coverage),
+                'locations': {
+                    'cities': dict(self.cities.most_common(n)),
+                    'states': dict(self.states.most_common(n)),
+                    'pincodes': dict(self.pincodes.most_common(n))
+                },
+                'products': dict(self.products.most_common(n)),
+                'distinct': {name: counter.estimate() for name, counter in self.distinct.items()}
+            }
+
+    def to_dict(self):
+        """JSON-safe state that from_dict turns back into an aggregator"""
+        with self._lock:
+            return {
+                'top_k': self.top_k,
+                'precision': self.precision,
+                'total': self.total,
+                'coverage': dict(self.coverage),
+                'cities': dict(self.cities.counts),
+                'states': dict(self.states.counts),
+                'pincodes': dict(self.pincodes.counts),
+                'products': dict(self.products.counts),
+                'distinct': {name: counter.registers.hex() for name, counter in self.distinct.items()}
+            }
+
+    @classmethod
+    def from_dict(cls, state):
+        aggregator = cls(top_k=state['top_k'], precision=state['precision'])
+        aggregator.total = state['total']
+        aggregator.coverage.update(state['coverage'])
+        for name in ('cities', 'states', 'pincodes', 'products'):
+            getattr(aggregator, name).counts = dict(state[name])
+        for name, registers in state['distinct'].items():
+            aggregator.distinct[name].registers = bytearray.fromhex(registers)
+        return aggregator
+
+    def save(self, path):
+        """Write the state and current statistics to path as JSON, atomically"""
+        state = self.to_dict()
+        state['insights'] = self.insights(n=20)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def summary(self, n=5):
+        """Printable summary of the collected data"""
+        insights = self.insights(n)
+        lines = [
+            "Summary of collected data:",
+            f"Total companies found: {insights['total_contractors']}",
+            f"Companies with email: {insights['contact_stats']['with_email']}",
+            f"Companies with phone: {insights['contact_stats']['with_phone']}",
+            f"Companies with website: {insights['contact_stats']['with_website']}",
+            f"Distinct websites (approx.): {insights['distinct']['websites']}"
+        ]
+        for title, counts in (('Top cities', insights['locations']['cities']),
+                              ('Top states', insights['locations']['states']),
+                              ('Top products', insights['products'])):
+            if counts:
+                lines.append(f"\n{title}:")
+                lines.extend(f"  {value}: {count}" for value, count in counts.items())
+        return '\n'.join(lines)
@@ -1,27 +1,54 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
+import os
+import socket
+import threading
 import time
-import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-import re
-from urllib.parse import urljoin, urlparse
-import json
 from WebScrap import LogisticsContractorScraper
+from browser_pool import BrowserPool, USER_AGENT
+from crawl_scheduler import CrawlScheduler
+from page_cache import PageCache
+from record_sink import RecordSink
+from dealer_store import DealerStore
+from dedup import merge_file, merge_records
+from site_crawler import SiteCrawler
+from http_client import HttpClient
+from parse_pool import ParsePool
+from crawl_metrics import CrawlMetrics, NULL_METRICS
+from crawl_frontier import CrawlFrontier
+from insights import InsightAggregator
+from page_archive import PageArchive
+from discovery import SeedListSource, SeedFileSource, ListingPageSource, SearchSource, stream_sources, drain
 
 class LogisticsFinder:
-    def __init__(self):
+    def __init__(self, max_workers=4, per_domain=1, pool_size=None, pages_per_driver=25,
+                 cache_path='page_cache.sqlite3', cache_ttl=7 * 24 * 3600, pages_per_site=10,
+                 parse_workers=None, metrics=None, capture_xhr=True, frontier_path=None,
+                 insights_path=None, archive_path=None, page_delay=(1, 3), use_browser=True):
         """Initialize the logistics finder"""
         self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+            'User-Agent': USER_AGENT
         }
-        self.setup_driver()
+        # Google searches and site scrapes share the browsers
+        self.pool = BrowserPool(size=pool_size or max_workers, max_pages=pages_per_driver, user_agent=USER_AGENT,
+                                capture_network=capture_xhr)
+        self.capture_xhr = capture_xhr
+        self.use_browser = use_browser
+        self.scheduler = CrawlScheduler(max_workers=max_workers, per_domain=per_domain, delay=(5, 10))
+        # Pages of one site share a host, so they are spaced like sites are
+        self.page_scheduler = CrawlScheduler(max_workers=1, per_domain=1, delay=page_delay)
+        self.pages_per_site = pages_per_site
+        self.metrics = metrics or NULL_METRICS
+        self.http = HttpClient(pool_size=max(8, max_workers))
+        # Each crawl thread parses one page at a time, so one process per
+        # thread is enough; parse_workers=0 parses on the crawl threads instead
+        self.parser = None
+        if parse_workers != 0:
+            self.parser = ParsePool(parse_workers or min(max_workers, os.cpu_count() or 1))
+        self.cache = PageCache(cache_path, ttl=cache_ttl) if cache_path else None
+        # Lets an interrupted crawl resume where it stopped (see begin_run)
+        self.frontier = CrawlFrontier(frontier_path) if frontier_path else None
+        self.insights = InsightAggregator()
+        self.insights_path = insights_path
+        self.archive = PageArchive(archive_path) if archive_path else None
         self.logistics_companies = []
         
         # List of known logistics companies
@@ -53,107 +80,227 @@ class LogisticsFinder:
             "transportation logistics India"
         ]
 
-    def setup_driver(self):
-        """Configure Selenium WebDriver"""
-        chrome_options = Options()
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_argument('--disable-infobars')
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument(f'--user-agent={self.headers["User-Agent"]}')
-        
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=chrome_options
-        )
-        
-        # Set window size
-        self.driver.set_window_size(1920, 1080)
-        
-        # Mask automation
-        self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-            'source': '''
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-                Object.defineProperty(navigator, 'plugins', {
-                    get: () => [1, 2, 3, 4, 5]
-                });
-                window.chrome = {
-                    runtime: {}
-                };
-            '''
-        })
-
-    def search_google(self, query):
-        """Search Google for logistics companies"""
-        try:
-            search_url = f"https://www.google.com/search?q={query}"
-            self.driver.get(search_url)
-            time.sleep(random.uniform(2, 4))
-            
-            # Extract all result links
-            links = self.driver.find_elements(By.CSS_SELECTOR, 'div.g a')
-            urls = []
-            
-            for link in links:
-                try:
-                    url = link.get_attribute('href')
-                    if url and url.startswith('http') and not any(x in url.lower() for x in ['google', 'youtube', 'facebook', 'linkedin']):
-                        urls.append(url)
-                except:
-                    continue
-            
-            return urls
-        except Exception as e:
-            print(f"Error searching Google: {str(e)}")
-            return []
+        # CSV seed lists and directory or sitemap pages that link to companies
+        self.seed_files = []
+        self.listing_pages = []
+
+    def close(self):
+        """Shut down the browsers, parser processes, HTTP client, page cache, frontier and archive"""
+        self.pool.close()
+        if self.parser is not None:
+            self.parser.close()
+        self.http.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.frontier is not None:
+            self.frontier.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    def begin_run(self, fresh=False):
+        """Start a crawl, returning whether it resumes an interrupted one"""
+        # Only a frontier remembers an unfinished run; fresh forces a new one
+        resuming = self.frontier is not None and self.frontier.begin_run(fresh)
+        self.insights = InsightAggregator()
+        if resuming and self.insights_path and os.path.exists(self.insights_path):
+            self.insights = InsightAggregator.load(self.insights_path)
+        return resuming
+
+    def run_tracked(self, kind, items, func, **kwargs):
+        """Run func over items on the scheduler, recording their status in the frontier
+
+        Yields (item, result, error) like CrawlScheduler.run. An item is only
+        marked done once the caller has handled its result, so one that was
+        being handled when the process died is redone on restart.
+        """
+        if self.frontier is None:
+            yield from self.scheduler.run(items, func, **kwargs)
+            return
+
+        def attempt(item):
+            self.frontier.start(kind, item)
+            return func(item)
+
+        for item, result, error in self.scheduler.run(items, attempt, **kwargs):
+            if error is not None:
+                self.frontier.fail(kind, item, error)
+            yield item, result, error
+            if error is None:
+                self.frontier.done(kind, item)
+
+    def discovery_sources(self):
+        """The sources candidate company sites are discovered from"""
+        sources = [SeedListSource(self.known_companies)]
+        sources.extend(SeedFileSource(path) for path in self.seed_files)
+        if self.listing_pages:
+            sources.append(ListingPageSource(self.listing_pages, client=self.http))
+        if self.search_queries:
+            sources.append(SearchSource(self.search_queries, self.pool, metrics=self.metrics))
+        return sources
+
+    def discover_companies(self, accept=None):
+        """Start discovery, returning a queue of company URLs closed by None"""
+        initial = ()
+        if self.frontier is not None:
+            # Sites left pending by an interrupted run go first
+            initial = self.frontier.pending('site')
+            frontier_accept = accept
+
+            def accept(url):
+                return self.frontier.admit('site', url) and (frontier_accept is None or frontier_accept(url))
+
+        return stream_sources(self.discovery_sources(), cache=self.cache, accept=accept, initial=initial)
 
     def find_logistics_companies(self):
         """Find logistics companies through various methods"""
-        all_urls = set(self.known_companies)
-        
-        # Search Google for more companies
-        for query in self.search_queries:
-            print(f"Searching for: {query}")
-            urls = self.search_google(query)
-            all_urls.update(urls)
-            time.sleep(random.uniform(10, 15))  # Be nice to Google
-        
-        return list(all_urls)
+        # One URL per site, so www. and /contact variants are crawled once
+        return drain(self.discover_companies())
+
+    def scrape_company(self, url):
+        """Scrape the contact and branch pages of a single company
+
+        Raises when every page failed, so the site counts as failed and is
+        retried rather than marked done.
+        """
+        print(f"\nProcessing: {url}")
+        # Find the contact pages rather than guessing their path
+        self.metrics.count('sites')
+        crawler = SiteCrawler(url, max_pages=self.pages_per_site, client=self.http, cache=self.cache)
+        with self.metrics.span('discover', url):
+            pages = crawler.discover()
+        if not pages:
+            # Nothing found over HTTP; the home page footer may still do
+            pages = [url]
+        print(f"Found {len(pages)} contact pages on {url}")
+
+        def scrape_page(page):
+            # Create a scraper instance for this page
+            scraper = LogisticsContractorScraper(page, pool=self.pool, cache=self.cache, http=self.http,
+                                                 parser=self.parser, metrics=self.metrics,
+                                                 capture_xhr=self.capture_xhr, archive=self.archive,
+                                                 response=crawler.fetched.get(page),
+                                                 use_browser=self.use_browser)
+            return scraper.scrape_data(), scraper.error
+
+        records = []
+        errors = []
+        for page, result, error in self.page_scheduler.run(pages, scrape_page):
+            if error is None:
+                page_records, error = result
+                records.extend(page_records)
+            if error is not None:
+                errors.append(error)
+        if len(errors) == len(pages):
+            raise RuntimeError(f"Every page of {url} failed, last error: {errors[-1]}")
+        return records
 
     def scrape_companies(self):
         """Scrape information from found companies"""
-        urls = self.find_logistics_companies()
-        print(f"Found {len(urls)} potential logistics companies")
-        
         all_data = []
-        for url in urls:
-            try:
-                print(f"\nProcessing: {url}")
-                # Try to find contact page
-                contact_url = url
-                if not url.lower().endswith('contact'):
-                    parsed_url = urlparse(url)
-                    contact_url = urljoin(url, 'contact')
-                
-                # Create a scraper instance for this company
-                scraper = LogisticsContractorScraper(contact_url)
-                company_data = scraper.scrape_data()
-                
-                if company_data:
-                    all_data.extend(company_data)
-                    print(f"Successfully scraped data from {url}")
-                
-                time.sleep(random.uniform(5, 10))  # Be nice to the servers
-                
-            except Exception as e:
-                print(f"Error processing {url}: {str(e)}")
+        # Sites are crawled in parallel as they are discovered, with the
+        # 5-10 second pause applied per host
+        for url, company_data, error in self.scheduler.run(self.discover_companies(), self.scrape_company):
+            if error is not None:
+                print(f"Error processing {url}: {str(error)}")
+                self.metrics.count('site_failures')
                 continue
+            if company_data:
+                all_data.extend(company_data)
+                print(f"Successfully scraped data from {url}")
         
-        return all_data
+        # Fold records for the same dealer found on several pages or sites
+        merged = merge_records(all_data)
+        self.insights.update(merged)
+        return merged
+
+    def stream_companies(self, sink):
+        """Scrape the found companies, writing records to sink as they arrive; returns the count"""
+        # Sites the sink or the frontier mark done are skipped, so an
+        # interrupted crawl resumes where it stopped
+        urls = self.discover_companies(accept=lambda url: not sink.is_done(url))
+
+        written = 0
+        for url, company_data, error in self.run_tracked('site', urls, self.scrape_company):
+            if error is not None:
+                print(f"Error processing {url}: {str(error)}")
+                self.metrics.count('site_failures')
+                continue
+            with self.metrics.span('output', url):
+                for record in company_data or []:
+                    sink.write(record)
+                    self.insights.add(record)
+                    written += 1
+                if self.insights_path:
+                    self.insights.save(self.insights_path)
+            # Failed sites are not marked, so a resumed crawl retries them
+            sink.mark_done(url)
+            if company_data:
+                print(f"Successfully scraped data from {url}")
+
+        if self.frontier is not None:
+            self.frontier.finish_run()
+        return written
+
+    def enqueue_companies(self, queue):
+        """Coordinator: feed every discovered company into a shared WorkQueue
+
+        Returns the number of sites queued; workers may start on them while
+        discovery is still running.
+        """
+        queued = 0
+        for url in iter(self.discover_companies().get, None):
+            queue.add([url])
+            queued += 1
+        queue.finish_discovery()
+        print(f"Queued {queued} logistics companies")
+        return queued
+
+    def work_queue(self, queue, worker_id=None, batch=None, poll=5):
+        """Worker: scrape sites leased from a shared WorkQueue until it is finished"""
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        batch = batch or 2 * self.scheduler.max_workers
+        stop = threading.Event()
+
+        # Keeps the leases alive and publishes this worker's insights
+        def heartbeat():
+            while not stop.wait(queue.heartbeat_ttl / 3):
+                try:
+                    queue.heartbeat(worker_id, self.insights)
+                except Exception as e:
+                    print(f"Heartbeat failed: {str(e)}")
+
+        queue.heartbeat(worker_id)
+        beating = threading.Thread(target=heartbeat, daemon=True)
+        beating.start()
+        written = 0
+        try:
+            while True:
+                urls = queue.claim(worker_id, batch)
+                if not urls:
+                    if queue.finished():
+                        break
+                    time.sleep(poll)
+                    continue
+                print(f"Worker {worker_id} leased {len(urls)} companies")
+                for url, company_data, error in self.scheduler.run(urls, self.scrape_company):
+                    if error is not None:
+                        print(f"Error processing {url}: {str(error)}")
+                        self.metrics.count('site_failures')
+                        queue.fail(worker_id, url, error)
+                        continue
+                    with self.metrics.span('output', url):
+                        if not queue.complete(worker_id, url, company_data or []):
+                            # The lease expired and another worker has the site now
+                            print(f"Lease on {url} was lost, dropping its records")
+                            continue
+                    self.insights.update(company_data or [])
+                    written += len(company_data or [])
+        finally:
+            stop.set()
+            beating.join()
+            queue.heartbeat(worker_id, self.insights)
+            queue.leave(worker_id)
+        return written
 
     def save_results(self, data, filename='all_logistics_companies.csv'):
         """Save scraped data to CSV"""
@@ -161,33 +308,50 @@ class LogisticsFinder:
             print("No data to save")
             return
         
-        # Convert to DataFrame for easier handling
-        df = pd.DataFrame(data)
-        
-        # Save to CSV
-        df.to_csv(filename, index=False)
+        with RecordSink(filename, resume=False) as sink:
+            for record in data:
+                sink.write(record)
         print(f"Data saved to {filename}")
         
-        # Print summary
-        print("\nSummary of collected data:")
-        print(f"Total companies found: {len(data)}")
-        print(f"Companies with email: {df['emails'].notna().sum()}")
-        print(f"Companies with phone: {df['phone_numbers'].notna().sum()}")
-        print(f"Companies with website: {df['website'].notna().sum()}")
-        
-        if 'city' in df.columns:
-            print("\nTop cities:")
-            print(df['city'].value_counts().head())
+        self.print_summary(InsightAggregator().update(data))
+
+    def save_to_sqlite(self, data, path='dealers.sqlite3'):
+        """Upsert scraped data into an indexed SQLite DealerStore"""
+        with DealerStore(path) as store:
+            store.upsert(data)
+        print(f"Data saved to {path}")
+
+    def print_summary(self, insights=None):
+        """Print counts of the collected data, by default those of this crawl"""
+        print("\n" + (insights or self.insights).summary())
 
 def main():
-    finder = LogisticsFinder()
+    # Spans stream to crawl_spans.jsonl; totals land in crawl_metrics.prom
+    metrics = CrawlMetrics(spans_path='crawl_spans.jsonl')
+    # Search and crawl progress survives restarts in crawl_frontier.sqlite3;
+    # live statistics are in crawl_insights.json and raw pages in pages.archive
+    finder = LogisticsFinder(metrics=metrics, frontier_path='crawl_frontier.sqlite3',
+                             insights_path='crawl_insights.json', archive_path='pages.archive')
+    finder.seed_files = ['quick_logistics_list.csv']
     print("Starting logistics company search...")
     
-    # Scrape company data
-    data = finder.scrape_companies()
-    
-    # Save results
-    finder.save_results(data)
+    try:
+        # Scrape company data, saving each record as it is extracted; an
+        # interrupted crawl appends to its output, a new one starts afresh
+        filename = 'all_logistics_companies.csv'
+        resuming = finder.begin_run()
+        with RecordSink(filename, resume=resuming) as sink:
+            finder.stream_companies(sink)
+        print(f"Data saved to {filename}")
+        # Records are written per page; fold them into one per dealer
+        merged = merge_file(filename, 'all_logistics_companies_merged.csv')
+        print(f"Merged {merged} dealers into all_logistics_companies_merged.csv")
+        
+        finder.print_summary()
+    finally:
+        finder.close()
+        metrics.write_prometheus('crawl_metrics.prom')
+        metrics.close()
 
 if __name__ == "__main__":
     main()
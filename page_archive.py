@@ -0,0 +1,220 @@
+import argparse
+import gzip
+import json
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from record_sink import RecordSink
+
+# Kinds of archived page, in the order re-extraction tries them: the HTML
+# fetched over HTTP, then the DOM the browser rendered
+PAGE_KINDS = ('static', 'rendered')
+
+
+class PageArchive:
+    def __init__(self, path='pages.archive', level=6):
+        """Append-only archive of raw fetched pages with an offset index
+
+        Every page is one gzip member holding a JSON header line (url, kind,
+        fetch time) followed by the body, so the whole file also reads with
+        zcat. A tab-separated index next to it (path + '.idx') records the
+        offset and length of each member for random access. Members missing
+        from the index, because it was lost or a crash came between the two
+        writes, are found by scanning the archive and indexed again when it
+        is opened; only a member cut short is dropped.
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self.level = level
+        self._lock = threading.Lock()
+        end = 0
+        if os.path.exists(self.index_path):
+            trim_index(self.index_path)
+            for offset, length, *_ in iter_index(self.index_path):
+                end = max(end, offset + length)
+        self._file = open(path, 'ab')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+        if self._file.tell() > end:
+            end = self._recover(end)
+            self._file.truncate(end)
+
+    def _recover(self, start):
+        """Index the complete members after start; returns where the last one ends"""
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for offset, length, header in scan_members(buffer, start):
+                self._index.write(f"{offset}\t{length}\t{header['kind']}\t{header['url']}\n")
+                start = offset + length
+        self._index.flush()
+        return start
+
+    def append(self, url, body, kind='static'):
+        """Store one page; returns its (offset, length)"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        header = json.dumps({'url': url, 'kind': kind, 'fetched_at': round(time.time(), 3)})
+        member = gzip.compress(header.encode('utf-8') + b'\n' + body, compresslevel=self.level, mtime=0)
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(member)
+            self._file.flush()
+            # Tabs and newlines cannot appear in a URL the crawler fetched
+            self._index.write(f"{offset}\t{len(member)}\t{kind}\t{url}\n")
+            self._index.flush()
+        return offset, len(member)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_index(index_path):
+    """Yield (offset, length, kind, url) for every complete index line"""
+    with open(index_path, encoding='utf-8') as f:
+        for line in f:
+            parts = line.rstrip('\n').split('\t', 3)
+            if len(parts) == 4 and line.endswith('\n'):
+                yield int(parts[0]), int(parts[1]), parts[2], parts[3]
+
+
+def trim_index(index_path):
+    """Drop a last index line left half written"""
+    with open(index_path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def scan_members(buffer, start=0, chunk=1 << 16):
+    """Yield (offset, length, header) of each complete member from start on
+
+    Stops at the first member that is cut short or corrupt.
+    """
+    offset = start
+    while offset < len(buffer):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        fed = 0
+        head = b''
+        try:
+            while not decompressor.eof and offset + fed < len(buffer):
+                piece = buffer[offset + fed:offset + fed + chunk]
+                fed += len(piece)
+                data = decompressor.decompress(piece)
+                if b'\n' not in head:
+                    head += data
+        except zlib.error:
+            return
+        if not decompressor.eof or b'\n' not in head:
+            return
+        try:
+            header = json.loads(head.partition(b'\n')[0])
+        except ValueError:
+            return
+        length = fed - len(decompressor.unused_data)
+        yield offset, length, header
+        offset += length
+
+
+def read_member(buffer, offset, length):
+    """Decode the page at offset of an archive buffer into (header, body)"""
+    data = gzip.decompress(buffer[offset:offset + length])
+    header, _, body = data.partition(b'\n')
+    return json.loads(header), body
+
+
+def latest_pages(index_path):
+    """[(url, {kind: (offset, length)})] of the newest copy of each page, in first-seen order"""
+    pages = {}
+    for offset, length, kind, url in iter_index(index_path):
+        pages.setdefault(url, {})[kind] = (offset, length)
+    return list(pages.items())
+
+
+_worker_archive = None
+_worker_extractor = None
+
+
+def _init_worker(path, extractor):
+    global _worker_archive, _worker_extractor
+    with open(path, 'rb') as f:
+        # Workers share the OS page cache instead of each reading a copy
+        _worker_archive = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _worker_extractor = extractor
+
+
+def extract_pages(pages):
+    """Worker entry point: records for a chunk of latest_pages() entries"""
+    from WebScrap import LogisticsContractorScraper
+
+    records = []
+    for url, kinds in pages:
+        scraper = LogisticsContractorScraper(url, extractor=_worker_extractor)
+        for kind in PAGE_KINDS:
+            if kind not in kinds:
+                continue
+            _, body = read_member(_worker_archive, *kinds[kind])
+            record, _ = scraper.parse_static(body.decode('utf-8', errors='replace'),
+                                             rendered=kind == 'rendered')
+            if record is not None:
+                records.append(record)
+                break
+    return records
+
+
+def reextract(archive_path, out_path, workers=None, extractor=None, chunk_size=256):
+    """Run the current extraction over the newest copy of every archived page
+
+    Pages are split into chunks of chunk_size and parsed by workers
+    processes that memory-map the archive, so nothing is fetched. Records
+    are written to out_path (CSV or JSON Lines by extension); returns how
+    many were written.
+    """
+    pages = latest_pages(archive_path + '.idx')
+    if not pages:
+        return 0
+    chunks = [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+    written = 0
+    with ProcessPoolExecutor(
+            max_workers=workers or multiprocessing.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(archive_path, extractor)) as executor, \
+            RecordSink(out_path, resume=False) as sink:
+        for records in executor.map(extract_pages, chunks):
+            for record in records:
+                sink.write(record)
+                written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-extract records from a page archive without fetching")
+    parser.add_argument('archive', help="archive written by the crawler, e.g. pages.archive")
+    parser.add_argument('output', help="CSV or .jsonl file for the fresh records")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument('--gazetteer', default=None, help="CSV of cities, states and districts to match")
+    args = parser.parse_args()
+
+    extractor = None
+    if args.gazetteer:
+        from extraction import ContactExtractor
+        extractor = ContactExtractor.from_gazetteer(args.gazetteer)
+
+    started = time.perf_counter()
+    count = reextract(args.archive, args.output, workers=args.workers, extractor=extractor)
+    print(f"Re-extracted {count} records into {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def content_hash(body):
+    """Stable fingerprint of a page body"""
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageCache:
+    def __init__(self, path='page_cache.sqlite3', ttl=7 * 24 * 3600, max_entries=50000):
+        """Persistent per-URL cache of HTTP validators and extracted records
+
+        Each entry keeps the ETag, Last-Modified and content hash of the page
+        along with the record extracted from it. Entries older than ttl
+        seconds are dropped so the page is extracted afresh; beyond
+        max_entries the least recently checked ones are evicted.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Scraper threads share the connection, serialised by the lock; other
+        # processes, like crawl workers on one host, may write to the file too
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                record TEXT,
+                stored_at REAL,
+                checked_at REAL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS pages_checked_at ON pages (checked_at)')
+        # JSON APIs a page was seen loading its contact data from
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS endpoints (
+                url TEXT,
+                endpoint TEXT,
+                learned_at REAL,
+                PRIMARY KEY (url, endpoint)
+            )
+        ''')
+        # Candidate sites returned by each discovery source and query
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS discovered (
+                source TEXT,
+                query TEXT,
+                urls TEXT,
+                fetched_at REAL,
+                PRIMARY KEY (source, query)
+            )
+        ''')
+        # Promising links of each crawled page, followed when it answers 304
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS links (
+                url TEXT PRIMARY KEY,
+                links TEXT,
+                stored_at REAL
+            )
+        ''')
+        self._conn.commit()
+        self.prune()
+
+    def get(self, url):
+        """Return the live entry for url as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, content_hash, record, stored_at FROM pages WHERE url = ?',
+                (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            etag, last_modified, digest, record, stored_at = row
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                self._conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+                self._conn.commit()
+                return None
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': digest,
+            'record': json.loads(record) if record else None
+        }
+
+    def conditional_headers(self, entry):
+        """Request headers that let the server answer 304 Not Modified"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def touch(self, url, etag=None, last_modified=None):
+        """Note that the cached page was confirmed unchanged"""
+        with self._lock:
+            self._conn.execute(
+                '''UPDATE pages SET checked_at = ?,
+                       etag = COALESCE(?, etag),
+                       last_modified = COALESCE(?, last_modified)
+                   WHERE url = ?''',
+                (time.time(), etag, last_modified, url)
+            )
+            self._conn.commit()
+
+    def store(self, url, record, etag=None, last_modified=None, digest=None):
+        """Save the record extracted from url with the page's validators"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO pages
+                       (url, etag, last_modified, content_hash, record, stored_at, checked_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (url, etag, last_modified, digest, json.dumps(record), now, now)
+            )
+            self._conn.commit()
+
+    def learn_endpoints(self, url, endpoints):
+        """Remember the JSON endpoints that carried url's contact data"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO endpoints (url, endpoint, learned_at) VALUES (?, ?, ?)',
+                [(url, endpoint, now) for endpoint in endpoints]
+            )
+            self._conn.commit()
+
+    def endpoints(self, url):
+        """JSON endpoints learned for url that have not expired"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT endpoint FROM endpoints WHERE url = ? AND learned_at >= ?',
+                (url, time.time() - self.ttl if self.ttl is not None else 0)
+            ).fetchall()
+        return [endpoint for endpoint, in rows]
+
+    def forget_endpoints(self, url):
+        """Drop the endpoints of url, e.g. once they stop returning contact data"""
+        with self._lock:
+            self._conn.execute('DELETE FROM endpoints WHERE url = ?', (url,))
+            self._conn.commit()
+
+    def links(self, url):
+        """(link, text) pairs stored for url that have not expired, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT links FROM links WHERE url = ? AND stored_at >= ?',
+                (url, time.time() - self.ttl if self.ttl is not None else 0)
+            ).fetchone()
+        return [tuple(link) for link in json.loads(row[0])] if row else None
+
+    def store_links(self, url, links):
+        """Remember the links of url so they can be followed without its body"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO links (url, links, stored_at) VALUES (?, ?, ?)',
+                (url, json.dumps(links), time.time())
+            )
+            self._conn.commit()
+
+    def discovered(self, source, query, ttl):
+        """URLs a discovery source found for query within the last ttl seconds, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT urls FROM discovered WHERE source = ? AND query = ? AND fetched_at >= ?',
+                (source, query, time.time() - ttl if ttl is not None else 0)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def store_discovered(self, source, query, urls):
+        """Remember the URLs a discovery source found for query"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO discovered (source, query, urls, fetched_at) VALUES (?, ?, ?, ?)',
+                (source, query, json.dumps(urls), time.time())
+            )
+            self._conn.commit()
+
+    def prune(self):
+        """Evict expired entries, then the least recently checked beyond max_entries"""
+        with self._lock:
+            if self.ttl is not None:
+                self._conn.execute('DELETE FROM pages WHERE stored_at < ?', (time.time() - self.ttl,))
+                self._conn.execute('DELETE FROM endpoints WHERE learned_at < ?', (time.time() - self.ttl,))
+                self._conn.execute('DELETE FROM links WHERE stored_at < ?', (time.time() - self.ttl,))
+            if self.max_entries is not None:
+                self._conn.execute(
+                    '''DELETE FROM pages WHERE url IN (
+                           SELECT url FROM pages ORDER BY checked_at DESC LIMIT -1 OFFSET ?
+                       )''',
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def close(self):
+        """Trim the cache and close the database"""
+        self.prune()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,80 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# Pages at least this large travel through shared memory instead of the
+# pool's pipe, so the body is copied once rather than pickled and unpickled
+SHARED_MEMORY_MIN = 64 * 1024
+
+_worker_extractor = None
+
+
+def _init_worker(extractor):
+    global _worker_extractor
+    _worker_extractor = extractor
+
+
+def _parse(url, html):
+    # Imported here so the parent does not need WebScrap to build a pool
+    from WebScrap import LogisticsContractorScraper
+    scraper = LogisticsContractorScraper(url, extractor=_worker_extractor)
+    return scraper.parse_static(html)
+
+
+def parse_bytes(url, body):
+    """Worker entry point for a page sent through the pipe"""
+    return _parse(url, body.decode('utf-8', errors='replace'))
+
+
+def parse_shared(url, name, size):
+    """Worker entry point for a page left in a shared memory block"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        html = bytes(block.buf[:size]).decode('utf-8', errors='replace')
+    finally:
+        block.close()
+    return _parse(url, html)
+
+
+class ParsePool:
+    def __init__(self, workers=None, extractor=None):
+        """Process pool that parses fetched HTML outside the GIL
+
+        This is a synchronous offload, not a pipeline: a crawl thread hands
+        its page to parse() and blocks until the record is back, so at most
+        one page per crawl thread is in flight. Size it to the crawl
+        threads; more workers would sit idle. extractor, if given, is sent
+        to each worker once when it starts.
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        # Crawl threads are running when workers start, so fork is not safe
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(extractor,)
+        )
+
+    def parse(self, url, html):
+        """Parse html in a worker, returning (record, None) or (None, reason)"""
+        body = html.encode('utf-8')
+        if len(body) < SHARED_MEMORY_MIN:
+            return self._executor.submit(parse_bytes, url, body).result()
+
+        block = shared_memory.SharedMemory(create=True, size=len(body))
+        try:
+            block.buf[:len(body)] = body
+            return self._executor.submit(parse_shared, url, block.name, len(body)).result()
+        finally:
+            block.close()
+            block.unlink()
+
+    def close(self):
+        """Stop the worker processes"""
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,146 @@
+import csv
+import json
+import os
+import threading
+
+# Fixed column order for dealer records; anything else is dropped
+RECORD_FIELDS = [
+    'name', 'website', 'emails', 'phone_numbers', 'address', 'pincode',
+    'city', 'state', 'district', 'country', 'products', 'sources', 'branches'
+]
+
+# Record file formats by extension, for writing and reading alike; .json
+# holds JSON Lines too, since records are streamed one per line
+RECORD_FORMATS = {
+    '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl',
+    '.sqlite3': 'sqlite', '.sqlite': 'sqlite', '.db': 'sqlite',
+}
+
+
+def record_format(path):
+    """'csv', 'jsonl' or 'sqlite' (a DealerStore) for a records file"""
+    return RECORD_FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+
+class RecordSink:
+    def __init__(self, path, format=None, fields=RECORD_FIELDS, batch_size=20, resume=True):
+        """Append-only writer that streams records to CSV or JSON Lines
+
+        Records are buffered and flushed every batch_size records, so memory
+        stays flat however long the crawl runs. URLs passed to mark_done are
+        logged to path + '.done' only after their records are flushed; with
+        resume an interrupted crawl can skip them, otherwise both files are
+        started afresh. format is 'csv' or 'jsonl' and defaults from the
+        file extension.
+        """
+        self.path = path
+        self.format = format or ('jsonl' if record_format(path) == 'jsonl' else 'csv')
+        self.fields = list(fields)
+        self.batch_size = batch_size
+        self.done_path = path + '.done'
+        self.done = set()
+        self.count = 0
+        self._records = []
+        self._done = []
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(self.done_path):
+            with open(self.done_path, encoding='utf-8') as f:
+                self.done.update(line.strip() for line in f if line.strip())
+        mode = 'a' if resume else 'w'
+        new_file = not resume or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, mode, newline='', encoding='utf-8')
+        self._done_file = open(self.done_path, mode, encoding='utf-8')
+        if self.format == 'csv':
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction='ignore')
+            if new_file:
+                self._writer.writeheader()
+
+    def row(self, record):
+        """Shape a record to the fixed schema"""
+        row = {field: record.get(field) for field in self.fields}
+        if self.format == 'csv':
+            # Flatten list fields; branches are dicts, so they go in as JSON
+            for key, value in row.items():
+                if isinstance(value, list) and value and isinstance(value[0], dict):
+                    row[key] = json.dumps(value, ensure_ascii=False)
+                elif isinstance(value, list):
+                    row[key] = ', '.join(str(v) for v in value)
+        return row
+
+    def write(self, record):
+        """Queue one record, flushing when the batch is full"""
+        with self._lock:
+            self._records.append(self.row(record))
+            self.count += 1
+            if len(self._records) >= self.batch_size:
+                self._flush()
+
+    def mark_done(self, url):
+        """Record that every record for url has been written"""
+        with self._lock:
+            self.done.add(url)
+            self._done.append(url)
+            if len(self._done) >= self.batch_size:
+                self._flush()
+
+    def is_done(self, url):
+        """Whether url was completed by this or an earlier run"""
+        return url in self.done
+
+    def _flush(self):
+        if self._records:
+            if self.format == 'csv':
+                self._writer.writerows(self._records)
+            else:
+                for row in self._records:
+                    self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            self._records = []
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        # Only now are the records for these URLs safely on disk
+        if self._done:
+            self._done_file.write(''.join(url + '\n' for url in self._done))
+            self._done = []
+            self._done_file.flush()
+
+    def flush(self):
+        """Write out everything buffered so far"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        """Flush and close the output files"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._flush()
+            self._file.close()
+            self._done_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path):
+    """Yield records from a CSV, JSON Lines file or DealerStore database"""
+    if record_format(path) == 'sqlite':
+        from dealer_store import DealerStore
+        with DealerStore(path) as store:
+            yield from store.query()
+    elif record_format(path) == 'jsonl':
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                record = {key: value if value != '' else None for key, value in row.items()}
+                if record.get('branches'):
+                    record['branches'] = json.loads(record['branches'])
+                yield record
@@ -0,0 +1,226 @@
+import hashlib
+import heapq
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, urldefrag
+
+from bs4 import BeautifulSoup
+
+from crawl_scheduler import domain_of
+from http_client import shared_client
+
+# Words in a URL or link text that point at contact or branch details
+CONTACT_KEYWORDS = {
+    'contact': 10, 'reach-us': 8, 'reachus': 8, 'get-in-touch': 8, 'find-us': 8,
+    'branch': 9, 'branches': 9, 'locate': 8, 'locator': 8, 'locations': 7, 'location': 6,
+    'offices': 7, 'office': 6, 'network': 5, 'address': 6, 'enquiry': 4, 'inquiry': 4,
+    'customer-service': 5, 'customer-support': 5, 'support': 3, 'help': 2, 'about': 1,
+}
+
+# Sections that never hold a dealer's contact details
+SKIP_KEYWORDS = (
+    'career', 'job', 'blog', 'news', 'press', 'login', 'signin', 'register', 'privacy',
+    'terms', 'cookie', 'track', 'investor', 'media', 'event', 'webinar'
+)
+
+SKIP_EXTENSIONS = (
+    '.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.doc', '.docx',
+    '.xls', '.xlsx', '.ppt', '.mp4', '.mp3', '.css', '.js', '.xml', '.json'
+)
+
+# Pages scoring lower (about, help, support) are crawled for their links
+# but not returned, so they never reach the scraper or its browser
+MIN_PAGE_SCORE = 3
+
+WORD_SPLIT_RE = re.compile(r'[^a-z0-9]+')
+SITEMAP_LOC_RE = re.compile(r'<loc>\s*([^<\s]+)\s*</loc>', re.IGNORECASE)
+
+
+def score_url(url, text=''):
+    """How likely a link leads to contact or branch details; 0 means skip it"""
+    path = urlparse(url).path.lower()
+    if path.endswith(SKIP_EXTENSIONS):
+        return 0
+    haystack = path + ' ' + text.lower()
+    words = set(WORD_SPLIT_RE.split(haystack))
+    if any(word.startswith(SKIP_KEYWORDS) for word in words):
+        return 0
+
+    score = 0
+    for keyword, weight in CONTACT_KEYWORDS.items():
+        if keyword in words or ('-' in keyword and keyword in haystack):
+            score += weight
+    if not score:
+        return 0
+    # Prefer shallow pages over deep ones with the same keywords
+    depth = len([part for part in path.split('/') if part])
+    return max(1, score - depth)
+
+
+class SiteCrawler:
+    def __init__(self, start_url, max_pages=10, top_k=4, max_fetches=None, max_frontier=500,
+                 timeout=15, client=None, cache=None):
+        """Bounded same-site crawler that finds contact and branch pages
+
+        Candidate links from sitemap.xml and the start page are scored by
+        their URL and link text. The top_k best are fetched in parallel each
+        round and their own links join the frontier, so a branch locator
+        leads on to the branch pages. Pages scoring under MIN_PAGE_SCORE are
+        only followed, not returned. At most max_pages pages are returned
+        and max_fetches (3 * max_pages by default) requests made per site;
+        the frontier keeps only the max_frontier best links and the visited
+        set holds 8-byte digests rather than URLs. Requests go through
+        client, an HttpClient, or the shared one. The responses of the
+        returned pages are kept in fetched, by URL, so they are not fetched
+        again to be scraped. With a PageCache, pages whose record is cached
+        are requested conditionally and a 304 is kept like any other page.
+        """
+        self.start_url = start_url
+        self.domain = domain_of(start_url)
+        self.max_pages = max_pages
+        self.top_k = top_k
+        self.max_fetches = max_fetches or 3 * max_pages
+        self.max_frontier = max_frontier
+        self.timeout = timeout
+        self.client = client or shared_client()
+        self.cache = cache
+        self.fetches = 0
+        self.fetched = {}
+        self._visited = set()
+        self._frontier = []
+        self._seq = 0
+
+    def key(self, url):
+        """Compact visited-set entry for a URL"""
+        parsed = urlparse(url)
+        canonical = f"{domain_of(url)}{parsed.path.rstrip('/')}?{parsed.query}".lower()
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).digest()
+
+    def same_site(self, url):
+        """Whether url is on the crawled host or one of its subdomains"""
+        domain = domain_of(url)
+        return domain == self.domain or domain.endswith('.' + self.domain)
+
+    def push(self, url, text=''):
+        """Add a link to the frontier if it is on-site, unseen and promising"""
+        url = urldefrag(url)[0]
+        if not url.startswith('http') or not self.same_site(url) or self.key(url) in self._visited:
+            return
+        score = score_url(url, text)
+        if not score:
+            return
+        self._seq += 1
+        heapq.heappush(self._frontier, (-score, self._seq, url))
+        if len(self._frontier) > 2 * self.max_frontier:
+            self._frontier = heapq.nsmallest(self.max_frontier, self._frontier)
+            heapq.heapify(self._frontier)
+
+    def pop_batch(self, count):
+        """Take up to count of the best unvisited links as (url, score) pairs"""
+        batch = []
+        while self._frontier and len(batch) < count:
+            score, _, url = heapq.heappop(self._frontier)
+            key = self.key(url)
+            if key in self._visited:
+                continue
+            self._visited.add(key)
+            batch.append((url, -score))
+        return batch
+
+    def fetch(self, url):
+        """GET a page, returning the response or None when it is unusable"""
+        headers = {}
+        if self.cache is not None:
+            entry = self.cache.get(url)
+            if entry and entry['record'] is not None:
+                headers = self.cache.conditional_headers(entry)
+        try:
+            response = self.client.get(url, headers=headers, timeout=self.timeout)
+        except Exception:
+            return None
+        if response.status_code == 304 and headers:
+            # Unchanged since it was scraped; the scraper reuses the cached record
+            return response
+        if response.status_code != 200:
+            return None
+        if 'html' not in response.headers.get('Content-Type', 'text/html').lower():
+            return None
+        return response
+
+    def links(self, base_url, html):
+        """Yield (absolute url, link text) for every anchor in the page"""
+        soup = BeautifulSoup(html, 'html.parser')
+        for anchor in soup.find_all('a', href=True):
+            yield urljoin(base_url, anchor['href']), anchor.get_text(' ', strip=True)
+
+    def follow(self, url, response):
+        """Push the links of a fetched page, from the cache when it answered 304"""
+        if response.status_code == 304:
+            links = self.cache.links(url) or []
+        else:
+            links = [(link, text) for link, text in self.links(response.url, response.text)
+                     if score_url(link, text)]
+            if self.cache is not None:
+                self.cache.store_links(url, links)
+        for link, text in links:
+            self.push(link, text)
+
+    def read_sitemap(self):
+        """Queue candidate pages listed in sitemap.xml, one index level deep"""
+        sitemaps = [urljoin(self.start_url, '/sitemap.xml')]
+        seen = 0
+        while sitemaps and self.fetches < self.max_fetches and seen < 4:
+            url = sitemaps.pop(0)
+            seen += 1
+            self.fetches += 1
+            try:
+                response = self.client.get(url, timeout=self.timeout)
+            except Exception:
+                continue
+            if response.status_code != 200:
+                continue
+            for loc in SITEMAP_LOC_RE.findall(response.text):
+                if loc.lower().endswith('.xml') or '.xml?' in loc.lower():
+                    # Child sitemaps named after pages or locations come first
+                    if any(word in loc.lower() for word in ('page', 'location', 'branch', 'contact')):
+                        sitemaps.insert(0, loc)
+                    else:
+                        sitemaps.append(loc)
+                else:
+                    self.push(loc)
+
+    def discover(self):
+        """Return the site's contact and branch pages, best first"""
+        self.fetches += 1
+        start = self.fetch(self.start_url)
+        self._visited.add(self.key(self.start_url))
+        if start is not None:
+            self.fetched[self.start_url] = start
+            self.follow(self.start_url, start)
+        self.read_sitemap()
+
+        pages = []
+        with ThreadPoolExecutor(max_workers=self.top_k) as executor:
+            while len(pages) < self.max_pages and self.fetches < self.max_fetches:
+                room = min(self.top_k, self.max_pages - len(pages), self.max_fetches - self.fetches)
+                batch = self.pop_batch(room)
+                if not batch:
+                    break
+                self.fetches += len(batch)
+                urls = [url for url, _ in batch]
+                for (url, score), response in zip(batch, executor.map(self.fetch, urls)):
+                    # Pages that 404 or redirect to non-HTML never reach the browser
+                    if response is None:
+                        continue
+                    final_url = url if response.status_code == 304 else response.url
+                    final_key = self.key(final_url)
+                    if final_key != self.key(url) and final_key in self._visited:
+                        # Redirected to a page already collected
+                        continue
+                    self._visited.add(final_key)
+                    if score >= MIN_PAGE_SCORE:
+                        pages.append(final_url)
+                        self.fetched[final_url] = response
+                    self.follow(final_url, response)
+
+        return pages
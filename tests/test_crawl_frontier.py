@@ -0,0 +1,60 @@
+from crawl_frontier import CrawlFrontier, DONE, FAILED, PENDING
+
+
+def test_sites_are_keyed_by_domain(tmp_path):
+    with CrawlFrontier(str(tmp_path / 'frontier.sqlite3')) as frontier:
+        frontier.add('site', ['https://www.dhl.com/in-en/home.html', 'https://dhl.com/', 'https://gati.com'])
+        assert frontier.pending('site') == ['https://www.dhl.com/in-en/home.html', 'https://gati.com']
+
+
+def test_interrupted_run_resumes_with_unfinished_items(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite3')
+    with CrawlFrontier(path) as frontier:
+        assert frontier.begin_run() is False
+        frontier.add('site', ['https://a.com', 'https://b.com', 'https://c.com'])
+        frontier.start('site', 'https://a.com')
+        frontier.done('site', 'https://a.com')
+        # b.com was being crawled when the process died
+        frontier.start('site', 'https://b.com')
+
+    with CrawlFrontier(path) as frontier:
+        assert frontier.begin_run() is True
+        assert frontier.pending('site') == ['https://b.com', 'https://c.com']
+        assert frontier.items('site', DONE) == ['https://a.com']
+
+
+def test_finished_run_starts_over(tmp_path):
+    path = str(tmp_path / 'frontier.sqlite3')
+    with CrawlFrontier(path) as frontier:
+        frontier.begin_run()
+        frontier.add('site', ['https://a.com', 'https://b.com'])
+        for url in ('https://a.com', 'https://b.com'):
+            frontier.start('site', url)
+            frontier.done('site', url)
+        frontier.finish_run()
+
+    with CrawlFrontier(path) as frontier:
+        assert frontier.begin_run() is False
+        assert frontier.pending('site') == ['https://a.com', 'https://b.com']
+
+
+def test_fresh_discards_an_interrupted_run(tmp_path):
+    with CrawlFrontier(str(tmp_path / 'frontier.sqlite3')) as frontier:
+        frontier.begin_run()
+        frontier.add('site', ['https://a.com'])
+        frontier.start('site', 'https://a.com')
+        frontier.done('site', 'https://a.com')
+        assert frontier.begin_run(fresh=True) is False
+        assert frontier.items('site', PENDING) == ['https://a.com']
+
+
+def test_failed_items_are_retried_up_to_max_attempts(tmp_path):
+    with CrawlFrontier(str(tmp_path / 'frontier.sqlite3'), max_attempts=2) as frontier:
+        frontier.add('site', ['https://a.com'])
+        for attempt in range(2):
+            assert frontier.admit('site', 'https://a.com')
+            frontier.start('site', 'https://a.com')
+            frontier.fail('site', 'https://a.com', RuntimeError('unreachable'))
+        assert not frontier.admit('site', 'https://a.com')
+        assert frontier.pending('site') == []
+        assert frontier.counts() == {('site', FAILED): 1}
@@ -0,0 +1,26 @@
+from dealer_store import DealerStore, normalize_website
+
+
+def test_pages_of_a_site_share_a_key():
+    assert normalize_website('https://www.DHL.com/in/contact/') == 'dhl.com'
+    assert normalize_website('dhl.com/in/branches?city=pune') == 'dhl.com'
+
+
+def test_pages_fold_into_one_dealer():
+    with DealerStore(':memory:') as store:
+        store.write({'name': 'DHL', 'website': 'https://dhl.com/contact', 'address': '1 Ring Rd',
+                     'phone_numbers': ['9800000001']})
+        store.write({'website': 'https://www.dhl.com/branches/pune', 'address': '2 FC Rd',
+                     'phone_numbers': ['9800000002']})
+        store.flush()
+        [dealer] = store.query()
+        assert dealer['name'] == 'DHL'
+        assert dealer['phone_numbers'] == ['9800000001', '9800000002']
+        assert [branch['address'] for branch in dealer['branches']] == ['1 Ring Rd', '2 FC Rd']
+
+
+def test_single_address_has_no_branches():
+    with DealerStore(':memory:') as store:
+        store.write({'name': 'Gati', 'website': 'https://gati.com', 'address': '3 MG Rd'})
+        store.flush()
+        assert list(store.query())[0]['branches'] == []
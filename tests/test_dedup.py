@@ -0,0 +1,29 @@
+from dedup import merge_records
+
+
+def test_branch_pages_of_one_site_merge_however_many():
+    records = [
+        {'name': 'DHL', 'website': f'https://www.dhl.com/in-en/branch/{i}', 'address': f'{i} Ring Road'}
+        for i in range(60)
+    ]
+    merged = merge_records(records, max_key_size=50)
+    assert len(merged) == 1
+    assert len(merged[0]['branches']) == 60
+
+
+def test_a_phone_shared_by_many_dealers_is_ignored():
+    records = [
+        {'name': f'Dealer {i}', 'website': f'https://dealer{i}.example', 'phone_numbers': ['1800 123 4567']}
+        for i in range(60)
+    ]
+    assert len(merge_records(records, max_key_size=50)) == 60
+
+
+def test_records_sharing_a_phone_merge():
+    records = [
+        {'name': 'Gati', 'website': 'https://gati.com', 'phone_numbers': ['+91 98765 43210']},
+        {'name': 'Gati Ltd', 'website': 'https://gati-kwe.com', 'phone_numbers': ['098765 43210']},
+    ]
+    merged = merge_records(records)
+    assert len(merged) == 1
+    assert merged[0]['sources'] == ['https://gati.com', 'https://gati-kwe.com']
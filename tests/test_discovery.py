@@ -0,0 +1,39 @@
+from discovery import DiscoverySource, stream_sources, drain
+from page_cache import PageCache
+
+
+class FakeSource(DiscoverySource):
+    name = 'fake'
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.searches = 0
+
+    def queries(self):
+        return ['logistics']
+
+    def search(self, query):
+        self.searches += 1
+        return self.answers.pop(0)
+
+
+def test_results_are_cached(tmp_path):
+    with PageCache(str(tmp_path / 'cache.sqlite3')) as cache:
+        source = FakeSource([['https://gati.com']])
+        assert list(source.results(cache)) == [('logistics', ['https://gati.com'])]
+        assert list(source.results(cache)) == [('logistics', ['https://gati.com'])]
+        assert source.searches == 1
+
+
+def test_empty_results_are_searched_again(tmp_path):
+    with PageCache(str(tmp_path / 'cache.sqlite3')) as cache:
+        # A blocked search comes back empty; it must not stick for the TTL
+        source = FakeSource([[], ['https://gati.com']])
+        assert list(source.results(cache)) == [('logistics', [])]
+        assert list(source.results(cache)) == [('logistics', ['https://gati.com'])]
+        assert source.searches == 2
+
+
+def test_stream_sources_dedupes_by_domain():
+    source = FakeSource([['https://www.gati.com/', 'https://gati.com/contact', 'https://facebook.com/gati']])
+    assert drain(stream_sources([source], initial=['https://dtdc.in'])) == ['https://dtdc.in', 'https://www.gati.com/']
@@ -0,0 +1,87 @@
+import random
+import re
+
+import pytest
+
+from extraction import ContactExtractor, DEFAULT_CITIES, DEFAULT_EXTRACTOR, DEFAULT_STATES, PHONE_PATTERNS
+
+
+# The per-call regex extraction the single-pass extractor replaced; its
+# results are the reference the extractor must keep matching
+
+def baseline_emails(text):
+    return list(set(re.findall(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', text)))
+
+
+def baseline_phones(text):
+    phones = set()
+    for pattern in PHONE_PATTERNS:
+        phones.update(re.findall(pattern, text))
+    cleaned = set()
+    for phone in phones:
+        digits = re.sub(r'\D', '', phone)
+        cleaned.add('+' + digits if len(digits) > 10 else digits)
+    return list(cleaned)
+
+
+def baseline_location(text):
+    info = {}
+    address_match = re.search(r'(?i)(?:address|location)[:\s]*(.*?)(?:\n|$)', text)
+    if address_match:
+        info['address'] = address_match.group(1).strip()
+    pincode_match = re.search(r'\b\d{6}\b', text)
+    if pincode_match:
+        info['pincode'] = pincode_match.group()
+    for city in DEFAULT_CITIES:
+        if re.search(rf'\b{city}\b', text, re.IGNORECASE):
+            info['city'] = city
+            break
+    for state in DEFAULT_STATES:
+        if re.search(rf'\b{state}\b', text, re.IGNORECASE):
+            info['state'] = state
+            break
+    info['country'] = 'India'
+    return info
+
+
+PIECES = (
+    DEFAULT_CITIES + DEFAULT_STATES
+    + ['Delhİ', 'ſurat', 'KANPUR', 'tamil  nadu', 'Pune1', 'xMumbai', 'Navi Mumbai']
+    + ['info@dealer.example', 'sales.delhi@pune.co.in', 'a@b', '@', 'x@y.z', 'mumbai@400001.in']
+    + ['+91 98765 43210', '098765-43210', '022.2345.6789', '9876543210', '+1-202-555-0143']
+    + ['400001', '1234567', '110 001', 'Address:', 'Location ', 'address: 12 MG Road\n']
+    + [' ', ' ', '\n', ',', '-', '.', '_', '<br>', 'é', 'İ', 'ſ', '0', 'ab']
+)
+
+
+def fuzz_texts(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield ''.join(rng.choice(PIECES) for _ in range(rng.randrange(1, 12)))
+
+
+@pytest.mark.parametrize('text', list(fuzz_texts(3000)))
+def test_matches_baseline(text):
+    assert sorted(DEFAULT_EXTRACTOR.extract_emails(text)) == sorted(baseline_emails(text))
+    assert sorted(DEFAULT_EXTRACTOR.extract_phone_numbers(text)) == sorted(baseline_phones(text))
+    assert DEFAULT_EXTRACTOR.extract_location_details(text) == baseline_location(text)
+
+
+def test_unicode_case_variants_resolve_to_the_place():
+    assert DEFAULT_EXTRACTOR.extract_location_details('Office in Delhİ')['city'] == 'Delhi'
+    assert DEFAULT_EXTRACTOR.extract_location_details('ſurat branch')['city'] == 'Surat'
+
+
+def test_extract_combines_the_scans():
+    text = 'Address: 5 Ring Road, Pune, Maharashtra 411001\nsales@dealer.example +91 98765 43210'
+    entities = DEFAULT_EXTRACTOR.extract(text)
+    assert entities['emails'] == ['sales@dealer.example']
+    assert sorted(entities['phone_numbers']) == sorted(baseline_phones(text))
+    assert entities['location'] == baseline_location(text)
+
+
+def test_gazetteer_order_decides_between_places():
+    extractor = ContactExtractor(cities=['Thane', 'Mumbai'], states=[], districts=['Mumbai Suburban'])
+    location = extractor.extract_location_details('Mumbai office, Thane depot, Mumbai Suburban district')
+    assert location['city'] == 'Thane'
+    assert location['district'] == 'Mumbai Suburban'
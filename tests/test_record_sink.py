@@ -0,0 +1,31 @@
+import pytest
+
+from insights import InsightAggregator, is_insights_file
+from record_sink import RecordSink, read_records
+
+RECORDS = [
+    {'name': 'Gati', 'website': 'https://gati.com', 'phone_numbers': ['9876543210'],
+     'branches': [{'address': '1 Ring Road', 'city': 'Pune'}, {'address': '2 MG Road'}]},
+    {'name': 'DTDC', 'website': 'https://dtdc.in', 'emails': ['info@dtdc.in']},
+]
+
+
+@pytest.mark.parametrize('name', ['records.csv', 'records.jsonl', 'records.json'])
+def test_written_records_read_back(tmp_path, name):
+    path = str(tmp_path / name)
+    with RecordSink(path, resume=False) as sink:
+        for record in RECORDS:
+            sink.write(record)
+    back = list(read_records(path))
+    assert [record['name'] for record in back] == ['Gati', 'DTDC']
+    assert back[0]['branches'] == RECORDS[0]['branches']
+
+
+def test_insights_files_are_told_from_records(tmp_path):
+    records = str(tmp_path / 'records.json')
+    with RecordSink(records, resume=False) as sink:
+        sink.write(RECORDS[0])
+    insights = str(tmp_path / 'insights.json')
+    InsightAggregator().update(RECORDS).save(insights)
+    assert not is_insights_file(records)
+    assert is_insights_file(insights)
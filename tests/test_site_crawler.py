@@ -0,0 +1,55 @@
+from page_cache import PageCache
+from site_crawler import SiteCrawler
+
+PAGES = {
+    'https://gati.com': '<a href="/contact">Contact</a>',
+    'https://gati.com/contact': '<a href="/branches">Branches</a>',
+    'https://gati.com/branches': '<p>Pune</p>',
+    'https://dtdc.in': '<a href="/about">About</a>',
+    'https://dtdc.in/about': '<a href="/contact">Contact</a>',
+    'https://dtdc.in/contact': '<p>Delhi</p>',
+}
+
+
+class FakeResponse:
+    def __init__(self, url, status_code, text=''):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = {'Content-Type': 'text/html', 'ETag': '"v1"'}
+
+
+class FakeClient:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=15):
+        self.requests.append((url, headers or {}))
+        if url not in PAGES:
+            return FakeResponse(url, 404)
+        if (headers or {}).get('If-None-Match') == '"v1"':
+            return FakeResponse(url, 304)
+        return FakeResponse(url, 200, PAGES[url])
+
+
+def test_cached_pages_are_requested_conditionally(tmp_path):
+    with PageCache(str(tmp_path / 'cache.sqlite3')) as cache:
+        first = SiteCrawler('https://gati.com', client=FakeClient(), cache=cache)
+        pages = first.discover()
+        assert pages == ['https://gati.com/contact', 'https://gati.com/branches']
+        for page in pages:
+            cache.store(page, {'address': page}, etag='"v1"')
+
+        client = FakeClient()
+        second = SiteCrawler('https://gati.com', client=client, cache=cache)
+        # The contact page answers 304, yet its branch link is still followed
+        assert second.discover() == pages
+        assert all(second.fetched[page].status_code == 304 for page in pages)
+        conditional = [url for url, headers in client.requests if 'If-None-Match' in headers]
+        assert conditional == pages
+
+
+def test_low_score_pages_are_followed_not_returned():
+    crawler = SiteCrawler('https://dtdc.in', client=FakeClient())
+    assert crawler.discover() == ['https://dtdc.in/contact']
+    assert 'https://dtdc.in/about' not in crawler.fetched
@@ -0,0 +1,105 @@
+import pytest
+
+from work_queue import SHARDS, HashRing, WorkQueue, shard_of
+
+SITES = [f'https://dealer{i}.example/' for i in range(40)]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with WorkQueue(str(tmp_path / 'queue.sqlite3')) as queue:
+        yield queue
+
+
+def drain(queue, worker_id):
+    """Claim and complete everything worker_id owns, one record per site"""
+    urls = []
+    while True:
+        claimed = queue.claim(worker_id)
+        if not claimed:
+            return urls
+        for url in claimed:
+            assert queue.complete(worker_id, url, [{'website': url}])
+        urls.extend(claimed)
+
+
+def test_ring_moves_few_shards_when_a_worker_joins():
+    before = HashRing(['a', 'b', 'c'])
+    after = HashRing(['a', 'b', 'c', 'd'])
+    moved = [shard for shard in range(SHARDS) if before.owner(str(shard)) != after.owner(str(shard))]
+    assert all(after.owner(str(shard)) == 'd' for shard in moved)
+    assert len(moved) < SHARDS / 2
+
+
+def test_workers_split_the_sites(queue):
+    queue.add(SITES)
+    queue.finish_discovery()
+    queue.heartbeat('a')
+    queue.heartbeat('b')
+    done_a, done_b = drain(queue, 'a'), drain(queue, 'b')
+    assert sorted(done_a + done_b) == sorted(SITES)
+    assert not set(done_a) & set(done_b)
+    assert {shard_of(url) for url in done_a}.isdisjoint(shard_of(url) for url in done_b)
+    assert queue.finished()
+    assert len(list(queue.records())) == len(SITES)
+
+
+def test_only_the_lease_holder_completes_a_site(queue):
+    queue.add(SITES[:1])
+    queue.heartbeat('a')
+    queue.heartbeat('b')
+    owner = next(worker_id for worker_id in ('a', 'b') if queue.claim(worker_id))
+    other = 'b' if owner == 'a' else 'a'
+
+    assert not queue.complete(other, SITES[0], [{'website': SITES[0]}])
+    queue.fail(other, SITES[0], 'lost lease')
+    assert queue.counts() == {'leased': 1}
+    assert queue.complete(owner, SITES[0], [{'website': SITES[0]}])
+    assert list(queue.records()) == [{'website': SITES[0]}]
+
+
+def test_expired_lease_is_handed_out_again(tmp_path):
+    with WorkQueue(str(tmp_path / 'queue.sqlite3'), lease_ttl=-1) as queue:
+        queue.add(SITES[:1])
+        queue.heartbeat('a')
+        assert queue.claim('a') == SITES[:1]
+        # The lease is already past due, so a second claim hands it out again
+        assert queue.claim('a') == SITES[:1]
+
+
+def test_failed_sites_are_retried_up_to_max_attempts(tmp_path):
+    with WorkQueue(str(tmp_path / 'queue.sqlite3'), max_attempts=2) as queue:
+        queue.add(SITES[:1])
+        queue.finish_discovery()
+        queue.heartbeat('a')
+        for attempt in range(2):
+            assert queue.claim('a') == SITES[:1]
+            queue.fail('a', SITES[0], 'unreachable')
+        assert queue.claim('a') == []
+        assert queue.finished()
+
+
+def test_reset_starts_a_new_coordination(queue):
+    queue.add(SITES)
+    queue.finish_discovery()
+    queue.heartbeat('a')
+    drain(queue, 'a')
+    assert queue.finished()
+
+    queue.reset()
+    assert not queue.discovery_done()
+    assert queue.counts() == {'pending': len(SITES)}
+    assert list(queue.records()) == []
+    queue.add(SITES)
+    assert sorted(drain(queue, 'a')) == sorted(SITES)
+
+
+def test_leave_hands_back_leases(queue):
+    queue.add(SITES)
+    queue.heartbeat('a')
+    claimed = queue.claim('a')
+    queue.leave('a')
+    assert 'a' not in queue.live_workers()
+    assert queue.counts() == {'pending': len(SITES)}
+    queue.heartbeat('b')
+    assert set(claimed) <= set(drain(queue, 'b'))
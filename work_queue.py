@@ -0,0 +1,273 @@
+import bisect
+import json
+import sqlite3
+import threading
+import time
+
+from dedup import canonical_domain
+from insights import InsightAggregator, hash64
+
+# Domains hash into this many shards; workers own shards, not single domains
+SHARDS = 256
+
+
+def shard_of(url):
+    """Shard of a URL's site; every page of a domain lands in the same one"""
+    return hash64(canonical_domain(url)) % SHARDS
+
+
+class HashRing:
+    def __init__(self, nodes, vnodes=64):
+        """Consistent hash ring placing vnodes points per node
+
+        When a node joins or leaves only the keys next to its points move,
+        about 1/len(nodes) of them, so the other workers keep their sites.
+        """
+        self.points = sorted((hash64(f"{node}#{i}"), node) for node in nodes for i in range(vnodes))
+        self._hashes = [point for point, _ in self.points]
+
+    def owner(self, key):
+        if not self.points:
+            return None
+        i = bisect.bisect(self._hashes, hash64(key)) % len(self.points)
+        return self.points[i][1]
+
+
+class WorkQueue:
+    def __init__(self, path='work_queue.sqlite3', lease_ttl=600, heartbeat_ttl=60, max_attempts=3):
+        """Shared, file-backed queue of sites for several crawl workers
+
+        A coordinator adds discovered sites; workers, in other processes or
+        on other hosts sharing the file, claim leases on the sites of the
+        shards they own on a consistent hash ring of the live workers, so a
+        domain's politeness delay and cached pages stay with one worker.
+        Workers heartbeat at least every heartbeat_ttl seconds, which also
+        extends their leases; a lease not renewed for lease_ttl seconds, for
+        example because its worker died, goes back to the queue. Records
+        from every worker are stored here so they can be merged into one
+        output. Failed sites are retried up to max_attempts times. A new
+        coordination calls reset first, so a queue file can be reused.
+        """
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self.heartbeat_ttl = heartbeat_ttl
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # Writers in other processes hold the database briefly; wait for them
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sites (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                shard INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                seq INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS sites_claim ON sites (status, shard, seq);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                heartbeat REAL,
+                insights TEXT
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT,
+                worker_id TEXT,
+                record TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT
+            );
+        ''')
+
+    def _write(self, statements):
+        """Run (sql, params) pairs in one write transaction"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                results = [self._conn.execute(sql, params).fetchall() for sql, params in statements]
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return results
+
+    def reset(self):
+        """Start a new coordination on this file: every site pending again, results and discovery cleared"""
+        self._write([
+            ('''UPDATE sites SET status = 'pending', owner = NULL, lease_expires = NULL,
+                    attempts = 0, last_error = NULL''', ()),
+            ('DELETE FROM results', ()),
+            ('DELETE FROM meta', ()),
+            ('UPDATE workers SET insights = NULL', ())
+        ])
+
+    def add(self, urls):
+        """Queue sites by canonical domain, ignoring ones already queued"""
+        rows = [(canonical_domain(url), url, shard_of(url)) for url in urls]
+        now = time.time()
+        self._write([
+            ('INSERT OR IGNORE INTO sites (key, url, shard, seq) VALUES (?, ?, ?, ?)',
+             (key, url, shard, now))
+            for key, url, shard in rows if key
+        ])
+
+    def finish_discovery(self):
+        """Tell workers no more sites are coming, so they stop once the queue is empty"""
+        self._write([("INSERT OR REPLACE INTO meta (name, value) VALUES ('discovery_done', '1')", ())])
+
+    def discovery_done(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM meta WHERE name = 'discovery_done'").fetchone() is not None
+
+    def heartbeat(self, worker_id, insights=None):
+        """Mark worker_id alive, extend its leases and save its InsightAggregator"""
+        now = time.time()
+        state = json.dumps(insights.to_dict()) if insights is not None else None
+        self._write([
+            ('''INSERT INTO workers (worker_id, heartbeat, insights) VALUES (?, ?, ?)
+                ON CONFLICT (worker_id) DO UPDATE SET heartbeat = excluded.heartbeat,
+                    insights = COALESCE(excluded.insights, workers.insights)''',
+             (worker_id, now, state)),
+            ("UPDATE sites SET lease_expires = ? WHERE status = 'leased' AND owner = ?",
+             (now + self.lease_ttl, worker_id))
+        ])
+
+    def live_workers(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT worker_id FROM workers WHERE heartbeat >= ? ORDER BY worker_id',
+                (time.time() - self.heartbeat_ttl,)
+            ).fetchall()
+        return [worker_id for worker_id, in rows]
+
+    def owned_shards(self, worker_id):
+        """Shards worker_id owns on the ring of live workers"""
+        ring = HashRing(set(self.live_workers()) | {worker_id})
+        return [shard for shard in range(SHARDS) if ring.owner(str(shard)) == worker_id]
+
+    def claim(self, worker_id, limit=8):
+        """Lease up to limit sites from worker_id's shards, returning their URLs
+
+        Expired leases are handed back first, so sites of a dead worker are
+        picked up by whoever owns their shard now.
+        """
+        shards = self.owned_shards(worker_id)
+        if not shards:
+            return []
+        now = time.time()
+        marks = ','.join('?' * len(shards))
+        results = self._write([
+            ("UPDATE sites SET status = 'pending', owner = NULL WHERE status = 'leased' AND lease_expires < ?",
+             (now,)),
+            (f'''UPDATE sites SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1
+                 WHERE key IN (
+                     SELECT key FROM sites
+                     WHERE shard IN ({marks})
+                       AND (status = 'pending' OR (status = 'failed' AND attempts < ?))
+                     ORDER BY seq LIMIT ?
+                 )
+                 RETURNING url''',
+             (worker_id, now + self.lease_ttl, *shards, self.max_attempts, limit))
+        ])
+        return [url for url, in results[1]]
+
+    def complete(self, worker_id, url, records):
+        """Store the records of a site leased by worker_id and mark it done
+
+        Returns False, storing nothing, when the lease expired and the site
+        went to another worker meanwhile.
+        """
+        key = canonical_domain(url)
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                owned = self._conn.execute(
+                    """UPDATE sites SET status = 'done', lease_expires = NULL
+                       WHERE key = ? AND owner = ? AND status = 'leased' RETURNING key""",
+                    (key, worker_id)
+                ).fetchall()
+                if owned:
+                    self._conn.executemany(
+                        'INSERT INTO results (key, worker_id, record) VALUES (?, ?, ?)',
+                        [(key, worker_id, json.dumps(record)) for record in records]
+                    )
+                self._conn.execute('COMMIT')
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+        return bool(owned)
+
+    def fail(self, worker_id, url, error):
+        """Mark a site leased by worker_id failed; a lost lease is left alone"""
+        self._write([
+            ("""UPDATE sites SET status = 'failed', owner = NULL, lease_expires = NULL, last_error = ?
+                WHERE key = ? AND owner = ? AND status = 'leased'""",
+             (str(error), canonical_domain(url), worker_id))
+        ])
+
+    def leave(self, worker_id):
+        """Hand back worker_id's leases and drop it from the ring"""
+        self._write([
+            ("UPDATE sites SET status = 'pending', owner = NULL, lease_expires = NULL WHERE status = 'leased' AND owner = ?",
+             (worker_id,)),
+            ('UPDATE workers SET heartbeat = 0 WHERE worker_id = ?', (worker_id,))
+        ])
+
+    def remaining(self):
+        """Sites still pending, leased or due for a retry"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sites WHERE status IN ('pending', 'leased') OR (status = 'failed' AND attempts < ?)",
+                (self.max_attempts,)
+            ).fetchone()[0]
+
+    def finished(self):
+        """Whether discovery is over and every site is done or out of attempts"""
+        return self.discovery_done() and self.remaining() == 0
+
+    def counts(self):
+        """Number of sites per status"""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM sites GROUP BY status').fetchall()
+        return dict(rows)
+
+    def records(self, batch=1000):
+        """Yield every record the workers stored"""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT id, record FROM results WHERE id > ? ORDER BY id LIMIT ?', (last, batch)
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            for _, record in rows:
+                yield json.loads(record)
+
+    def insights(self):
+        """InsightAggregator merged from every worker's last heartbeat"""
+        with self._lock:
+            rows = self._conn.execute('SELECT insights FROM workers WHERE insights IS NOT NULL').fetchall()
+        merged = InsightAggregator()
+        for state, in rows:
+            merged.merge(InsightAggregator.from_dict(json.loads(state)))
+        return merged
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,124 @@
+import json
+import re
+
+from extraction import EMAIL_PATTERN
+
+# Keys that mark a JSON object as an office, branch or contact entry
+CONTACT_KEYS = (
+    'address', 'addr', 'street', 'phone', 'mobile', 'tel', 'telephone', 'contact',
+    'email', 'mail', 'pincode', 'pin', 'zip', 'postal', 'city', 'state', 'branch', 'office'
+)
+
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+PHONE_LIKE_RE = re.compile(r'\+?\d[\d\s-]{8,}\d')
+KEY_SPLIT_RE = re.compile(r'[^a-z]+')
+
+# Responses bigger than this are not worth pulling out of the browser
+MAX_BODY_BYTES = 5 * 1024 * 1024
+
+
+def drain_network_log(driver):
+    """Read the performance log, returning {requestId: (url, method, mime)} of XHR/fetch responses"""
+    try:
+        entries = driver.get_log('performance')
+    except Exception:
+        return {}
+
+    methods = {}
+    responses = {}
+    for entry in entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError, TypeError):
+            continue
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent':
+            methods[params.get('requestId')] = params.get('request', {}).get('method', 'GET')
+        elif message.get('method') == 'Network.responseReceived':
+            response = params.get('response', {})
+            mime = response.get('mimeType', '')
+            if params.get('type') in ('XHR', 'Fetch') or 'json' in mime:
+                responses[params.get('requestId')] = (response.get('url'), mime)
+    return {
+        request_id: (url, methods.get(request_id, 'GET'), mime)
+        for request_id, (url, mime) in responses.items()
+    }
+
+
+def captured_json(driver):
+    """JSON bodies of the XHR/fetch responses seen since the log was last drained
+
+    Returns a list of (url, method, data).
+    """
+    captured = []
+    for request_id, (url, method, mime) in drain_network_log(driver).items():
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            # The body is gone once the page navigates or frees it
+            continue
+        if body.get('base64Encoded') or len(body.get('body', '')) > MAX_BODY_BYTES:
+            continue
+        data = parse_json(body.get('body', ''))
+        if data is not None:
+            captured.append((url, method, data))
+    return captured
+
+
+def parse_json(text):
+    """Decode a JSON body, tolerating anti-hijacking prefixes like )]}'"""
+    text = text.strip()
+    if not text:
+        return None
+    start = min((i for i in (text.find('{'), text.find('[')) if i >= 0), default=-1)
+    if start < 0:
+        return None
+    try:
+        return json.loads(text[start:])
+    except ValueError:
+        return None
+
+
+def key_words(key):
+    return set(KEY_SPLIT_RE.split(str(key).lower()))
+
+
+def is_contact_object(obj):
+    """Whether a dict looks like one office or contact entry"""
+    if not isinstance(obj, dict):
+        return False
+    hits = sum(1 for key in obj if key_words(key) & set(CONTACT_KEYS))
+    if hits >= 2:
+        return True
+    values = [v for v in obj.values() if isinstance(v, str)]
+    return hits >= 1 and any(EMAIL_RE.search(v) or PHONE_LIKE_RE.search(v) for v in values)
+
+
+def contact_objects(data, limit=5000):
+    """Every office or contact entry in a JSON document, outermost first"""
+    found = []
+    stack = [data]
+    while stack and len(found) < limit:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if is_contact_object(node):
+                found.append(node)
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return found
+
+
+def flatten(obj, prefix=''):
+    """Render a JSON value as 'key: value' lines the text extractor understands"""
+    lines = []
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            lines.extend(flatten(value, str(key)))
+    elif isinstance(obj, list):
+        for value in obj:
+            lines.extend(flatten(value, prefix))
+    elif obj is not None and obj != '':
+        lines.append(f"{prefix}: {obj}" if prefix else str(obj))
+    return lines